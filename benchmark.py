@@ -0,0 +1,296 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from lsystem_core import compile_rules, encode_symbols, rewrite_codes
+from task1a import (read_l_system_from_file, generate_l_system, plan_l_system,
+                    walk_turtle, interpret_instructions, normalize_points)
+from task1b import draw_fractal_tree, plot_tree, tree_segments
+from raster import Rasterizer
+
+# Файлы определений из каталога и способ их отрисовки
+CATALOGUE = [
+    ("Кривая Коха.txt", "raster"),
+    ("koch_snowflake.txt", "raster"),
+    ("Квадратный остров Коха.txt", "raster"),
+    ("Ковёр Серпинского.txt", "raster"),
+    ("Наконечник Серпинского.txt", "raster"),
+    ("Кривая дракона Хартера-Хейтуэя.txt", "raster"),
+    ("Шестиугольная кривая Госпера.txt", "raster"),
+    ("Кривая Гильберта.txt", "raster"),
+    ("Куст 1.txt", "raster"),
+    ("Куст 2.txt", "raster"),
+    ("Куст 3.txt", "raster"),
+    ("Дерево.txt", "raster"),
+    ("Фрактальное дерево.txt", "tree"),
+    ("fractal_tree_example.txt", "tree"),
+]
+
+STAGES = ("parse", "generate", "points", "normalize", "render")
+
+
+def measure(function, *args, repeat=3):
+    """Минимальное время выполнения функции за repeat запусков (в секундах)."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def benchmark_interpreter(cases):
+    """Сравнение посимвольной и векторной интерпретации черепахой."""
+    print(f"{'Файл':<42} {'итер.':>5} {'символов':>10} {'цикл, с':>9} {'numpy, с':>9} {'ускор.':>7}")
+    for filename, iterations in cases:
+        l_system = read_l_system_from_file(filename)
+        if l_system is None:
+            continue
+        instructions = generate_l_system(l_system["atom"], l_system["rules"], iterations)
+        args = (instructions, l_system["angle"], l_system["start_direction"], 1.0)
+
+        loop_time, (loop_points, _) = measure(walk_turtle, *args)
+        numpy_time, (numpy_points, _) = measure(interpret_instructions, *args)
+        assert np.allclose(loop_points, numpy_points)
+
+        print(f"{filename:<42} {iterations:>5} {len(instructions):>10} "
+              f"{loop_time:>9.3f} {numpy_time:>9.3f} {loop_time / numpy_time:>6.1f}x")
+
+
+def draw_tree(l_system, iterations):
+    fig, ax = draw_fractal_tree(l_system, iterations, step_length=15.0, initial_thickness=8.0,
+                                thickness_decay=0.6, color_transition=0.6, angle_randomness=10.0)
+    fig.canvas.draw()
+    plt.close(fig)
+
+
+def benchmark_tree(filename, iterations_range):
+    """Время построения и отрисовки дерева (draw_fractal_tree + canvas.draw)."""
+    l_system = read_l_system_from_file(filename)
+    print(f"{'итер.':>5} {'отрезков':>10} {'время, с':>9}")
+    for iterations in iterations_range:
+        instructions = generate_l_system(l_system["atom"], l_system["rules"], iterations)
+        elapsed, _ = measure(draw_tree, l_system, iterations, repeat=1)
+        print(f"{iterations:>5} {instructions.count('F'):>10} {elapsed:>9.3f}")
+
+
+def rewrite_loop(string, rules):
+    """Одна итерация посимвольным циклом (прежняя реализация generate_l_system)."""
+    result = []
+    for char in string:
+        if char in rules:
+            result.append(rules[char])
+        else:
+            result.append(char)
+    return "".join(result)
+
+
+def benchmark_rewrite(max_length=1_000_000, files=None):
+    """
+    Время одной итерации переписывания для каждого определения каталога:
+    посимвольный цикл, generate_l_system на одну итерацию (вместе с переводом
+    строки в коды и обратно) и rewrite_codes — итерация над массивом кодов,
+    как внутри generate_l_system при нескольких итерациях. Ускорение — цикл
+    против rewrite_codes.
+    """
+    print(f"{'Файл':<42} {'ит.':>3} {'символов':>10} {'цикл, с':>9} {'generate':>9} "
+          f"{'массив, с':>9} {'ускор.':>7}")
+    for filename, _ in CATALOGUE:
+        if files and filename not in files:
+            continue
+        l_system = read_l_system_from_file(filename)
+        rules = l_system["rules"]
+        table = compile_rules(rules, l_system["atom"])
+        for iterations in iteration_ladder(l_system, max_length):
+            previous = generate_l_system(l_system["atom"], rules, iterations - 1)
+            loop_time, expected = measure(rewrite_loop, previous, rules)
+            table_time, result = measure(generate_l_system, previous, rules, 1)
+            codes = encode_symbols(table, previous)
+            array_time, _ = measure(rewrite_codes, table, codes)
+            assert result == expected
+
+            print(f"{filename:<42} {iterations:>3} {len(result):>10} {loop_time:>9.4f} "
+                  f"{table_time:>9.4f} {array_time:>9.4f} {loop_time / array_time:>6.1f}x")
+
+
+def iteration_ladder(l_system, max_length, max_iterations=30):
+    """Число итераций от 1 и выше, пока длина строки по plan_l_system не превысит max_length."""
+    plan = plan_l_system(l_system, max_iterations)
+    return [level["iteration"] for level in plan["levels"][1:] if level["length"] <= max_length]
+
+
+def run_stages(filename, renderer, iterations, output):
+    """Один прогон конвейера; возвращает время стадий и размеры результата."""
+    timings = {}
+
+    start = time.perf_counter()
+    l_system = read_l_system_from_file(filename)
+    timings["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    instructions = generate_l_system(l_system["atom"], l_system["rules"], iterations)
+    timings["generate"] = time.perf_counter() - start
+
+    if renderer == "tree":
+        start = time.perf_counter()
+        segments, depths = tree_segments(instructions, l_system["angle"], l_system["start_direction"],
+                                         step_length=15.0, angle_randomness=10.0, seed=0)
+        timings["points"] = time.perf_counter() - start
+        timings["normalize"] = 0.0
+
+        # Только отрисовка: раскрытие и обход черепахи уже замерены выше
+        start = time.perf_counter()
+        fig, ax = plot_tree(segments, depths, iterations)
+        fig.savefig(output)
+        plt.close(fig)
+        timings["render"] = time.perf_counter() - start
+        return timings, {"length": len(instructions), "segments": len(segments)}
+
+    start = time.perf_counter()
+    points, breaks = interpret_instructions(instructions, l_system["angle"], l_system["start_direction"])
+    timings["points"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    points = normalize_points(points)
+    timings["normalize"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rasterizer = Rasterizer(512, 512, (0.0, 0.0, 1.0, 1.0))
+    rasterizer.draw(points, breaks)
+    rasterizer.save(output)
+    timings["render"] = time.perf_counter() - start
+
+    return timings, {"length": len(instructions), "segments": int(np.count_nonzero(~breaks[1:]))}
+
+
+def run_suite(max_length=1_000_000, repeat=3, files=None):
+    """
+    Прогон всех определений каталога по возрастающему числу итераций.
+    Для каждой стадии берётся лучшее время из repeat запусков; пик памяти
+    меряется отдельным запуском под tracemalloc, чтобы не искажать время.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, "render.png")
+        for filename, renderer in CATALOGUE:
+            if files and filename not in files:
+                continue
+            l_system = read_l_system_from_file(filename)
+            for iterations in iteration_ladder(l_system, max_length):
+                best = None
+                for _ in range(repeat):
+                    timings, sizes = run_stages(filename, renderer, iterations, output)
+                    best = timings if best is None else {stage: min(best[stage], timings[stage])
+                                                         for stage in STAGES}
+
+                tracemalloc.start()
+                run_stages(filename, renderer, iterations, output)
+                peak_memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+                result = {"file": filename, "iterations": iterations, "renderer": renderer,
+                          "stages": best, "total": sum(best.values()),
+                          "peak_memory": peak_memory, **sizes}
+                results.append(result)
+                print(f"{filename:<42} {iterations:>3} {result['length']:>10} "
+                      + " ".join(f"{best[stage]:>8.4f}" for stage in STAGES)
+                      + f" {peak_memory / 2 ** 20:>8.1f}", flush=True)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=1.2, min_seconds=0.01):
+    """
+    Сравнение с сохранённым прогоном. Регрессия — стадия или пик памяти,
+    выросшие более чем в threshold раз (для времени — ещё и не меньше
+    чем на min_seconds, чтобы не реагировать на шум).
+    Возвращает список регрессий.
+    """
+    previous = {(result["file"], result["iterations"]): result for result in baseline["results"]}
+    regressions = []
+
+    for result in current["results"]:
+        old = previous.get((result["file"], result["iterations"]))
+        if old is None:
+            continue
+        for stage in STAGES + ("total",):
+            new_time = result["total"] if stage == "total" else result["stages"][stage]
+            old_time = old["total"] if stage == "total" else old["stages"][stage]
+            if new_time > old_time * threshold and new_time - old_time >= min_seconds:
+                regressions.append((result["file"], result["iterations"], stage, old_time, new_time))
+        if result["peak_memory"] > old["peak_memory"] * threshold:
+            regressions.append((result["file"], result["iterations"], "peak_memory",
+                                old["peak_memory"], result["peak_memory"]))
+
+    for filename, iterations, stage, old_value, new_value in regressions:
+        print(f"РЕГРЕССИЯ {filename} ({iterations} итер.) {stage}: "
+              f"{old_value:.4g} -> {new_value:.4g} ({new_value / old_value:.2f}x)")
+    if not regressions:
+        print("Регрессий не найдено")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Замеры производительности L-систем")
+    parser.add_argument("--output", help="куда сохранить результаты в JSON")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON с базовым прогоном для сравнения")
+    parser.add_argument("--threshold", type=float, default=1.2, help="допустимый рост (во сколько раз)")
+    parser.add_argument("--max-length", type=int, default=1_000_000,
+                        help="наибольшая длина строки инструкций в лестнице итераций")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--files", nargs="*", help="только эти файлы каталога")
+    parser.add_argument("--micro", action="store_true",
+                        help="сравнение интерпретаторов и отрисовки дерева вместо полного прогона")
+    parser.add_argument("--rewrite", action="store_true",
+                        help="сравнение способов переписывания по итерациям вместо полного прогона")
+    args = parser.parse_args()
+
+    if args.rewrite:
+        benchmark_rewrite(args.max_length, args.files)
+        sys.exit(0)
+
+    if args.micro:
+        benchmark_interpreter([
+            ("Кривая Коха.txt", 7),
+            ("Квадратный остров Коха.txt", 4),
+            ("Кривая дракона Хартера-Хейтуэя.txt", 15),
+            ("Кривая дракона Хартера-Хейтуэя.txt", 18),
+        ])
+        print()
+        benchmark_tree("Фрактальное дерево.txt", range(7, 13))
+        sys.exit(0)
+
+    print(f"{'Файл':<42} {'ит.':>3} {'символов':>10} "
+          + " ".join(f"{stage:>8}" for stage in STAGES) + f" {'МБ':>8}")
+    current = run_suite(args.max_length, args.repeat, args.files)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(current, file, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if compare(current, baseline, args.threshold):
+            sys.exit(1)
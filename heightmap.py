@@ -0,0 +1,123 @@
+import numpy as np
+
+from random_streams import seed_sequence, height_stream
+
+# Наибольшее число значений в одной полосе при пошаговой обработке
+# (временные массивы полосы float32 — по 4 МБ)
+TILE_SIZE = 1 << 20
+
+# Фазы шага: ромб (центры квадратов) и квадрат (середины сторон по строкам и по столбцам)
+DIAMOND, SQUARE_ROWS, SQUARE_COLUMNS = 0, 1, 2
+
+
+def _bands(count, width, tile_size):
+    """Разбиение count строк по width значений на полосы не больше tile_size значений."""
+    rows = max(1, tile_size // max(width, 1))
+    for start in range(0, count, rows):
+        yield start, min(start + rows, count)
+
+
+def _diamond(heights, step, amplitude, stream, tile_size):
+    """Центры квадратов: среднее четырёх углов плюс смещение."""
+    half = step // 2
+    count = (len(heights) - 1) // step
+    for first, last in _bands(count, count + 1, tile_size):
+        corners = np.asarray(heights[first * step:last * step + 1:step, ::step], dtype=np.float32)
+        centers = (corners[:-1, :-1] + corners[:-1, 1:] + corners[1:, :-1] + corners[1:, 1:]) / 4
+        offsets = stream.values(first * count, (last - first) * count).reshape(-1, count)
+        heights[half + first * step:last * step:step, half::step] = centers + amplitude * offsets
+
+
+def _square_rows(heights, step, amplitude, stream, tile_size):
+    """Середины горизонтальных сторон: строки step * i, столбцы half + step * j."""
+    half = step // 2
+    count = (len(heights) - 1) // step
+    for first, last in _bands(count + 1, count + 1, tile_size):
+        corners = np.asarray(heights[first * step:last * step:step, ::step], dtype=np.float32)
+        total = corners[:, :-1] + corners[:, 1:]
+        neighbours = np.full((last - first, 1), 2, dtype=np.float32)
+
+        # Центры сверху (строка step * i - half) и снизу (step * i + half)
+        above = max(first, 1)
+        if above < last:
+            total[above - first:] += heights[above * step - half:last * step - half:step, half::step]
+            neighbours[above - first:] += 1
+        below = min(last, count)
+        if first < below:
+            total[:below - first] += heights[first * step + half:below * step + half:step, half::step]
+            neighbours[:below - first] += 1
+
+        offsets = stream.values(first * count, (last - first) * count).reshape(-1, count)
+        heights[first * step:last * step:step, half::step] = total / neighbours + amplitude * offsets
+
+
+def _square_columns(heights, step, amplitude, stream, tile_size):
+    """Середины вертикальных сторон: строки half + step * i, столбцы step * j."""
+    half = step // 2
+    count = (len(heights) - 1) // step
+    for first, last in _bands(count, count + 1, tile_size):
+        corners = np.asarray(heights[first * step:last * step + 1:step, ::step], dtype=np.float32)
+        total = corners[:-1] + corners[1:]
+        neighbours = np.full(count + 1, 2, dtype=np.float32)
+        neighbours[1:-1] += 2
+        neighbours[[0, -1]] += 1
+
+        # Центры слева и справа от точки
+        centers = np.asarray(heights[half + first * step:last * step:step, half::step],
+                             dtype=np.float32)
+        total[:, 1:] += centers
+        total[:, :-1] += centers
+
+        offsets = stream.values(first * (count + 1), (last - first) * (count + 1)).reshape(-1, count + 1)
+        heights[half + first * step:last * step:step, ::step] = total / neighbours + amplitude * offsets
+
+
+def diamond_square(iterations, roughness=1.0, seed=None, output=None, tile_size=TILE_SIZE):
+    """
+    Карта высот алгоритмом "ромб-квадрат" размером (2 ** iterations + 1)²
+    в float32. Как и у одномерного профиля, смещения на первом шаге лежат
+    в [-roughness, roughness] и на каждом следующем шаге уменьшаются вдвое.
+
+    output — путь к файлу .npy: карта строится прямо в отображённом в память
+    файле полосами не больше tile_size значений, так что расход памяти
+    не зависит от размера карты (8193² и больше). Без output карта
+    строится в памяти.
+
+    Смещение каждой точки определяется зерном seed и её положением,
+    поэтому результат не зависит от tile_size и совпадает для обоих режимов.
+    """
+    size = 2 ** iterations + 1
+    if output is None:
+        heights = np.zeros((size, size), dtype=np.float32)
+    else:
+        # Новый файл заполнен нулями, углы карты остаются на нулевой высоте
+        heights = np.lib.format.open_memmap(output, mode="w+", dtype=np.float32, shape=(size, size))
+
+    sequence = seed_sequence(seed)
+    amplitude = roughness
+    step = size - 1
+    level = 0
+    while step > 1:
+        _diamond(heights, step, amplitude, height_stream(sequence, level, DIAMOND), tile_size)
+        _square_rows(heights, step, amplitude, height_stream(sequence, level, SQUARE_ROWS), tile_size)
+        _square_columns(heights, step, amplitude, height_stream(sequence, level, SQUARE_COLUMNS),
+                        tile_size)
+        amplitude /= 2
+        step //= 2
+        level += 1
+
+    if output is not None:
+        heights.flush()
+    return heights
+
+
+def heightmap_preview(heights, size=256):
+    """
+    Уменьшенная копия карты для просмотра: каждая n-я точка по обеим осям
+    (без чтения всей карты), высоты переведены в оттенки серого uint8.
+    """
+    stride = max(1, -(-len(heights) // size))
+    preview = np.asarray(heights[::stride, ::stride], dtype=np.float32)
+    low, high = preview.min(), preview.max()
+    scale = 255 / (high - low) if high > low else 0.0
+    return np.rint((preview - low) * scale).astype(np.uint8)
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from lsystem_core import encode_string
+
+CACHE_VERSION = 1
+
+
+class DiskCache:
+    """
+    Кэш раскрытых L-систем на диске.
+
+    Ключ — хеш разобранного определения вместе с числом итераций,
+    случайностью, зерном и длиной шага. Для каждого ключа в отдельном
+    каталоге хранятся строка инструкций (как массив кодов), нормализованные
+    точки и маска возвратов в файлах .npy, которые читаются через отображение
+    в память без копирования. Время изменения каталога служит отметкой
+    последнего обращения; при превышении max_bytes удаляются самые давние записи.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 2 ** 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(l_system, iterations, randomness=0.0, seed=None, step_length=1.0):
+        description = {
+            "version": CACHE_VERSION,
+            "atom": l_system["atom"],
+            "rules": l_system["rules"],
+            "angle": l_system["angle"],
+            "start_direction": l_system["start_direction"],
+            "iterations": iterations,
+            "randomness": randomness,
+            "seed": seed,
+            "step_length": step_length,
+        }
+        text = json.dumps(description, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def load(self, key):
+        """
+        Запись по ключу или None. Массивы отображаются в память только для чтения.
+        """
+        path = self._path(key)
+        try:
+            entry = {
+                "instructions": np.load(os.path.join(path, "instructions.npy"), mmap_mode="r"),
+                "points": np.load(os.path.join(path, "points.npy"), mmap_mode="r"),
+                "breaks": np.load(os.path.join(path, "breaks.npy"), mmap_mode="r"),
+            }
+        except (FileNotFoundError, ValueError):
+            return None
+
+        os.utime(path)
+        return entry
+
+    def store(self, key, instructions, points, breaks):
+        """
+        Сохраняет запись и возвращает её в виде отображённых массивов.
+        Запись пишется во временный каталог и переименовывается целиком,
+        так что параллельные читатели не видят её частично.
+        """
+        codes = encode_string(instructions) if isinstance(instructions, str) else instructions
+        size = codes.nbytes + np.asarray(points).nbytes + np.asarray(breaks).nbytes
+        if size > self.max_bytes:
+            return None
+
+        staging = tempfile.mkdtemp(prefix=".tmp-", dir=self.directory)
+        try:
+            np.save(os.path.join(staging, "instructions.npy"), codes)
+            np.save(os.path.join(staging, "points.npy"), np.asarray(points, dtype=float))
+            np.save(os.path.join(staging, "breaks.npy"), np.asarray(breaks, dtype=bool))
+            os.replace(staging, self._path(key))
+        except OSError:
+            # Запись с этим ключом уже есть (например, от параллельного процесса)
+            shutil.rmtree(staging, ignore_errors=True)
+
+        self.evict()
+        return self.load(key)
+
+    def entries(self):
+        """Список записей (время обращения, размер в байтах, путь)."""
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith(".") or not os.path.isdir(path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(path))
+            entries.append((os.stat(path).st_mtime, size, path))
+        return entries
+
+    def evict(self):
+        """Удаляет самые давние записи, пока общий размер превышает max_bytes."""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            shutil.rmtree(path, ignore_errors=True)
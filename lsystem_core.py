@@ -0,0 +1,227 @@
+import numpy as np
+
+from random_streams import seed_sequence, keep_stream
+
+# Сколько символов переписывается за один проход по массиву кодов
+# (ограничивает память под временные массивы индексов)
+REWRITE_CHUNK = 1 << 18
+
+
+def parse_l_system(text):
+    """
+    Разбор определения L-системы из текста (формат — как у файла,
+    см. read_l_system_from_file). При ошибке формата — ValueError.
+    """
+    l_system = {
+        "atom": "",
+        "rules": {},
+        "angle": 0,
+        "start_direction": 0
+    }
+
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if len(lines) < 2:
+        raise ValueError("Файл должен содержать как минимум 2 строки")
+
+    first_line = lines[0].split()
+    if len(first_line) < 2:
+        raise ValueError("Первая строка должна содержать атом и угол поворота")
+    l_system["atom"] = first_line[0]
+    l_system["angle"] = float(first_line[1])
+    l_system["start_direction"] = float(first_line[2]) if len(first_line) > 2 else 0
+
+    for line in lines[1:]:
+        if '→' in line:
+            key, value = line.split('→', 1)
+        elif '=' in line:
+            key, value = line.split('=', 1)
+        else:
+            parts = line.split(':', 1)
+            if len(parts) == 2:
+                key, value = parts
+            else:
+                continue
+
+        l_system["rules"][key.strip()] = value.strip()
+
+    return l_system
+
+
+def read_l_system_from_file(filename):
+    """
+    Чтение L-системы из текстового файла
+    Формат файла:
+    <атом> <угол поворота> <начальное направление>
+    <правило №1>
+    <правило №2>
+    ...
+    """
+    try:
+        with open(filename, 'r', encoding='utf-8') as file:
+            return parse_l_system(file.read())
+
+    except Exception as e:
+        print(f"Ошибка при чтении файла {filename}: {e}")
+        return None
+
+
+def compile_rules(rules, axiom=""):
+    """
+    Таблицы для быстрого переписывания. Символы раскрываются по одному,
+    поэтому действуют только правила с односимвольным ключом.
+
+    Код символа — его номер в Unicode: строка переводится в массив кодов
+    кодированием latin-1 (uint8), а если есть символы не меньше 256,
+    кодированием utf-32 (uint32). Замены всех символов алфавита лежат подряд
+    в массиве flat: замена символа с кодом i начинается с starts[i] и имеет
+    длину lengths[i]; символ без правила заменяется сам на себя. В конце flat
+    добавлены все коды по порядку — для случайно сохранённых символов.
+    """
+    rules = {key: value for key, value in rules.items() if len(key) == 1}
+    alphabet = sorted(set(axiom).union(rules, *rules.values()))
+    size = max(256, ord(alphabet[-1]) + 1) if alphabet else 256
+
+    table = {
+        "dtype": np.uint8 if size == 256 else np.uint32,
+        # Таблица str.translate, если все правила заменяют символ одним символом
+        "translation": (str.maketrans(rules)
+                        if all(len(value) == 1 for value in rules.values()) else None),
+    }
+
+    has_rule = np.zeros(size, dtype=bool)
+    lengths = np.zeros(size, dtype=np.int64)
+    starts = np.zeros(size, dtype=np.int64)
+    replacements = []
+    offset = 0
+    for char in alphabet:
+        replacement = rules.get(char, char)
+        code = ord(char)
+        has_rule[code] = char in rules
+        lengths[code] = len(replacement)
+        starts[code] = offset
+        replacements.append(replacement)
+        offset += len(replacement)
+
+    table.update(has_rule=has_rule, lengths=lengths, starts=starts, kept_start=offset)
+    table["flat"] = np.concatenate((encode_symbols(table, "".join(replacements)),
+                                    np.arange(size, dtype=table["dtype"])))
+    return table
+
+
+def encode_symbols(table, symbols):
+    """Строка символов алфавита в массив кодов."""
+    if table["dtype"] == np.uint8:
+        return np.frombuffer(symbols.encode("latin-1"), dtype=np.uint8)
+    return np.frombuffer(symbols.encode("utf-32-le"), dtype="<u4")
+
+
+def decode_symbols(table, codes):
+    """Массив кодов обратно в строку."""
+    if table["dtype"] == np.uint8:
+        return codes.tobytes().decode("latin-1")
+    return codes.astype("<u4").tobytes().decode("utf-32-le")
+
+
+def encode_string(symbols):
+    """
+    Строка в массив кодов без таблицы правил (например, для хранения):
+    uint8, если все символы меньше 256, иначе uint32 — как в encode_symbols.
+    """
+    try:
+        return encode_symbols({"dtype": np.uint8}, symbols)
+    except UnicodeEncodeError:
+        return encode_symbols({"dtype": np.uint32}, symbols)
+
+
+def decode_string(codes):
+    """Массив кодов из encode_string обратно в строку."""
+    return decode_symbols({"dtype": codes.dtype}, codes)
+
+
+def rewrite_codes(table, codes, keep=None):
+    """
+    Одна итерация переписывания над массивом кодов. Каждый код заменяется
+    своим отрезком flat: индексы всех символов результата получаются
+    через np.repeat и cumsum, без цикла по символам.
+    keep — маска по символам с правилами (в порядке следования):
+    True означает, что символ остаётся без переписывания.
+    """
+    lengths = table["lengths"][codes]
+    starts = table["starts"][codes]
+    if keep is not None:
+        kept = np.flatnonzero(table["has_rule"][codes])[keep]
+        lengths[kept] = 1
+        starts[kept] = table["kept_start"] + codes[kept].astype(np.int64)
+
+    parts = []
+    for begin in range(0, len(codes), REWRITE_CHUNK):
+        chunk_lengths = lengths[begin:begin + REWRITE_CHUNK]
+        ends = np.cumsum(chunk_lengths)
+        if len(ends) == 0 or ends[-1] == 0:
+            continue
+        source = np.repeat(starts[begin:begin + REWRITE_CHUNK] - (ends - chunk_lengths), chunk_lengths)
+        source += np.arange(ends[-1])
+        parts.append(table["flat"][source])
+    return np.concatenate(parts) if parts else codes[:0]
+
+
+def generate_l_system(axiom, rules, iterations, randomness=0.0, seed=None):
+    """
+    seed — зерно (int, SeedSequence или numpy Generator) для случайных решений.
+    Решения для итерации берутся одним массивом из её подпотока, так что
+    результат для одного и того же зерна воспроизводим.
+
+    Правила заранее компилируются в таблицы (compile_rules), и символы
+    переписываются без цикла на Python: str.translate, если каждое правило
+    заменяет символ одним символом, иначе все итерации идут над массивом
+    кодов (rewrite_codes), а строка собирается один раз в конце. Случайные
+    решения подаются в rewrite_codes маской на всю итерацию.
+    """
+    table = compile_rules(rules, axiom)
+    sequence = seed_sequence(seed) if randomness > 0 else None
+
+    if sequence is None and table["translation"] is not None:
+        current_string = axiom
+        for _ in range(iterations):
+            current_string = current_string.translate(table["translation"])
+        return current_string
+
+    codes = encode_symbols(table, axiom)
+    for iteration in range(iterations):
+        keep = None
+        if sequence is not None:
+            count = int(np.count_nonzero(table["has_rule"][codes]))
+            keep = keep_stream(sequence, iteration, randomness).take(count).astype(bool)
+        codes = rewrite_codes(table, codes, keep)
+
+    return decode_symbols(table, codes)
+
+
+def iter_l_system(axiom, rules, iterations, randomness=0.0, seed=None):
+    """
+    Ленивое раскрытие L-системы: обходит дерево переписываний в глубину
+    и выдаёт символы по одному. Память пропорциональна числу итераций,
+    а не длине результата.
+    Символы каждого уровня обходятся слева направо, как и в generate_l_system,
+    поэтому при одном и том же seed результат совпадает.
+    """
+    if randomness > 0:
+        sequence = seed_sequence(seed)
+        streams = [keep_stream(sequence, iteration, randomness) for iteration in range(iterations)]
+
+    # Стек пар (итератор по строке, сколько итераций осталось применить)
+    stack = [(iter(axiom), iterations)]
+
+    while stack:
+        symbols, depth = stack[-1]
+        char = next(symbols, None)
+        if char is None:
+            stack.pop()
+            continue
+
+        if depth == 0 or char not in rules:
+            yield char
+        elif randomness > 0 and next(streams[iterations - depth]):
+            stack.append((iter(char), depth - 1)) #Сохраняется исходный символ
+        else:
+            stack.append((iter(rules[char]), depth - 1)) #Применяется правило
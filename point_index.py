@@ -0,0 +1,59 @@
+import math
+
+
+class GridIndex:
+    """
+    Пространственный индекс точек на равномерной сетке.
+
+    Каждая точка хранится под постоянным идентификатором в ячейке
+    (floor(x / cell_size), floor(y / cell_size)). Добавление, сдвиг
+    и удаление меняют только затронутые ячейки, а поиск ближайшей точки
+    в радиусе r просматривает лишь ячейки, пересекающие квадрат со стороной 2r.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.positions = {}
+
+    def _cell(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def insert(self, point_id, x, y):
+        self.positions[point_id] = (x, y)
+        self.cells.setdefault(self._cell(x, y), set()).add(point_id)
+
+    def remove(self, point_id):
+        x, y = self.positions.pop(point_id)
+        cell = self._cell(x, y)
+        self.cells[cell].discard(point_id)
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def move(self, point_id, x, y):
+        old = self._cell(*self.positions[point_id])
+        new = self._cell(x, y)
+        self.positions[point_id] = (x, y)
+        if old != new:
+            self.cells[old].discard(point_id)
+            if not self.cells[old]:
+                del self.cells[old]
+            self.cells.setdefault(new, set()).add(point_id)
+
+    def nearest(self, x, y, radius):
+        """Идентификатор ближайшей точки не дальше radius от (x, y) или None."""
+        first_column, first_row = self._cell(x - radius, y - radius)
+        last_column, last_row = self._cell(x + radius, y + radius)
+
+        best, best_distance = None, radius * radius
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                for point_id in self.cells.get((column, row), ()):
+                    px, py = self.positions[point_id]
+                    distance = (px - x) ** 2 + (py - y) ** 2
+                    if distance <= best_distance:
+                        best, best_distance = point_id, distance
+        return best
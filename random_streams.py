@@ -0,0 +1,112 @@
+import numpy as np
+
+# Размер блока случайных чисел одного подпотока
+CHUNK_SIZE = 65536
+
+# Метки подпотоков (ключи SeedSequence — неотрицательные целые)
+KEEP, JITTER, HEIGHT = 0, 1, 2
+
+
+def seed_sequence(seed=None):
+    """
+    SeedSequence из зерна: целого числа, SeedSequence или numpy Generator
+    (из него берётся новое зерно). None — непредсказуемое зерно.
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    if isinstance(seed, np.random.Generator):
+        return np.random.SeedSequence(int(seed.integers(2 ** 63)))
+    return np.random.SeedSequence(seed)
+
+
+def substream(sequence, *key):
+    """Независимый генератор для подпотока key (например, номер итерации и блока)."""
+    child = np.random.SeedSequence(sequence.entropy, spawn_key=tuple(sequence.spawn_key) + key)
+    return np.random.default_rng(child)
+
+
+class ChunkedStream:
+    """
+    Последовательность случайных значений, разбитая на блоки по CHUNK_SIZE.
+    Блок j берётся из собственного подпотока (key..., j), поэтому любой блок
+    можно получить независимо от остальных, а результат не зависит от того,
+    какими порциями значения запрашиваются.
+    """
+
+    def __init__(self, sequence, key, sampler):
+        self.sequence = sequence
+        self.key = tuple(key)
+        self.sampler = sampler
+        self._chunk = 0
+        self._buffer = np.empty(0)
+        self._position = 0
+
+    def chunk(self, index):
+        return self.sampler(substream(self.sequence, *self.key, index), CHUNK_SIZE)
+
+    def _refill(self):
+        self._buffer = self.chunk(self._chunk).tolist()
+        self._chunk += 1
+        self._position = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._position == len(self._buffer):
+            self._refill()
+        value = self._buffer[self._position]
+        self._position += 1
+        return value
+
+    def take(self, count):
+        """Следующие count значений одним массивом."""
+        parts = []
+        if self._position < len(self._buffer):
+            part = self._buffer[self._position:self._position + count]
+            self._position += len(part)
+            parts.append(np.asarray(part))
+            count -= len(part)
+        while count > 0:
+            values = self.chunk(self._chunk)
+            self._chunk += 1
+            if count < len(values):
+                self._buffer = values.tolist()
+                self._position = count
+                values = values[:count]
+            parts.append(values)
+            count -= len(values)
+        return np.concatenate(parts) if parts else np.empty(0)
+
+    def values(self, start, count):
+        """
+        Значения с номерами start ... start + count - 1 (произвольный доступ,
+        текущая позиция последовательного чтения не меняется).
+        """
+        if count <= 0:
+            return np.empty(0)
+        first, last = start // CHUNK_SIZE, (start + count - 1) // CHUNK_SIZE
+        values = np.concatenate([self.chunk(index) for index in range(first, last + 1)])
+        offset = start - first * CHUNK_SIZE
+        return values[offset:offset + count]
+
+
+def keep_stream(sequence, iteration, randomness):
+    """Решения "сохранить символ без переписывания" для итерации iteration."""
+    return ChunkedStream(sequence, (KEEP, iteration),
+                         lambda rng, size: rng.random(size) < randomness)
+
+
+def jitter_stream(sequence, amplitude):
+    """Случайные отклонения угла в градусах, равномерно в [-amplitude, amplitude]."""
+    return ChunkedStream(sequence, (JITTER,),
+                         lambda rng, size: rng.uniform(-amplitude, amplitude, size))
+
+
+def height_stream(sequence, level, phase):
+    """
+    Случайные смещения высот в [-1, 1) для шага level и фазы phase карты высот.
+    Значения float32, как и сама карта, чтобы полосы смещений занимали вдвое меньше памяти.
+    """
+    return ChunkedStream(sequence, (HEIGHT, level, phase),
+                         lambda rng, size: rng.uniform(-1.0, 1.0, size).astype(np.float32))
@@ -0,0 +1,140 @@
+import struct
+import zlib
+
+import numpy as np
+
+
+def png_bytes(image):
+    """
+    Изображение в байтах PNG без сторонних библиотек.
+    image — массив uint8 формы (высота, ширина) или (высота, ширина, 3).
+    """
+    image = np.ascontiguousarray(image, dtype=np.uint8)
+    height, width = image.shape[:2]
+    color_type = 2 if image.ndim == 3 else 0
+
+    # Каждая строка предваряется байтом фильтра (0 — без фильтра)
+    rows = image.reshape(height, -1)
+    raw = np.zeros((height, rows.shape[1] + 1), dtype=np.uint8)
+    raw[:, 1:] = rows
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    return b"".join((b"\x89PNG\r\n\x1a\n", chunk(b"IHDR", header),
+                     chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)), chunk(b"IEND", b"")))
+
+
+def write_png(filename, image):
+    """Запись изображения в PNG (см. png_bytes)."""
+    with open(filename, "wb") as file:
+        file.write(png_bytes(image))
+
+
+def fit_bbox(width, height, bbox, margin=10, pixels=False):
+    """
+    Масштаб и сдвиги (scale, offset_x, offset_y), которые вписывают bbox
+    в страницу width x height с полями margin, с сохранением пропорций
+    и по центру. pixels=True — координаты центров пикселей растра:
+    крайние лежат в 0 и width - 1. Иначе (векторные форматы) страница
+    занимает от 0 до width.
+    """
+    inset = 1 if pixels else 0
+    xmin, ymin, xmax, ymax = bbox
+    span = max(xmax - xmin, ymax - ymin)
+    usable = min(width, height) - 2 * margin - inset
+    scale = usable / span if span > 0 else 1.0
+    offset_x = (width - inset - (xmax - xmin) * scale) / 2 - xmin * scale
+    offset_y = (height - inset - (ymax - ymin) * scale) / 2 - ymin * scale
+    return scale, offset_x, offset_y
+
+
+class Rasterizer:
+    """
+    Растеризация отрезков в буфер NumPy без matplotlib.
+
+    Отрезки разбиваются на выборки с шагом не больше пикселя по длинной оси,
+    и все выборки наносятся на буфер покрытия разом. При сглаживании каждая
+    выборка распределяется билинейно между четырьмя соседними пикселями.
+    Точки можно подавать частями: последняя точка предыдущей части
+    соединяется с первой точкой следующей.
+    """
+
+    def __init__(self, width, height, bbox, margin=10, antialias=True,
+                 color=(0, 100, 0), background=(255, 255, 255)):
+        self.width = width
+        self.height = height
+        self.antialias = antialias
+        self.color = np.array(color, dtype=np.float32)
+        self.background = np.array(background, dtype=np.float32)
+        self.coverage = np.zeros(height * width, dtype=np.float32)
+        self._last = None
+
+        self.scale, self.offset_x, self.offset_y = fit_bbox(width, height, bbox, margin, pixels=True)
+
+    def to_pixels(self, points):
+        """Координаты точек в пикселях (ось y направлена вниз)."""
+        pixels = np.empty((len(points), 2))
+        pixels[:, 0] = points[:, 0] * self.scale + self.offset_x
+        pixels[:, 1] = self.height - 1 - (points[:, 1] * self.scale + self.offset_y)
+        return pixels
+
+    def draw(self, points, breaks=None):
+        """
+        Рисует ломаную через points. breaks[i] = True означает, что отрезок,
+        ведущий в точку i, не рисуется (возврат черепахи по "]").
+        """
+        points = np.asarray(points, dtype=float)
+        if len(points) == 0:
+            return
+        if breaks is None:
+            breaks = np.zeros(len(points), dtype=bool)
+
+        pixels = self.to_pixels(points)
+        if self._last is not None:
+            pixels = np.concatenate(([self._last], pixels))
+            drawn = ~np.asarray(breaks, dtype=bool)
+        else:
+            drawn = ~np.asarray(breaks, dtype=bool)[1:]
+        self._last = pixels[-1]
+
+        self.draw_segments(pixels[:-1][drawn], pixels[1:][drawn])
+
+    def draw_segments(self, starts, ends):
+        """Наносит отрезки (в пиксельных координатах) на буфер покрытия."""
+        if len(starts) == 0:
+            return
+
+        delta = ends - starts
+        counts = np.ceil(np.abs(delta).max(axis=1)).astype(np.int64) + 1
+        segment = np.repeat(np.arange(len(starts)), counts)
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        t = (np.arange(len(segment)) - first) / np.maximum(counts - 1, 1)[segment]
+        samples = starts[segment] + delta[segment] * t[:, None]
+
+        if self.antialias:
+            base = np.floor(samples)
+            fraction = samples - base
+            base = base.astype(np.int64)
+            for dx, dy in ((0, 0), (1, 0), (0, 1), (1, 1)):
+                wx = fraction[:, 0] if dx else 1 - fraction[:, 0]
+                wy = fraction[:, 1] if dy else 1 - fraction[:, 1]
+                ix, iy = base[:, 0] + dx, base[:, 1] + dy
+                inside = (ix >= 0) & (ix < self.width) & (iy >= 0) & (iy < self.height)
+                np.add.at(self.coverage, iy[inside] * self.width + ix[inside], (wx * wy)[inside])
+        else:
+            pixels = np.rint(samples).astype(np.int64)
+            ix, iy = pixels[:, 0], pixels[:, 1]
+            inside = (ix >= 0) & (ix < self.width) & (iy >= 0) & (iy < self.height)
+            self.coverage[iy[inside] * self.width + ix[inside]] = 1.0
+
+    def image(self):
+        """RGB-изображение uint8: цвет линии, смешанный с фоном по покрытию."""
+        alpha = np.minimum(self.coverage, 1.0).reshape(self.height, self.width, 1)
+        image = self.background + (self.color - self.background) * alpha
+        return np.rint(image).astype(np.uint8)
+
+    def save(self, filename):
+        write_png(filename, self.image())
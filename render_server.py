@@ -0,0 +1,384 @@
+import argparse
+import io
+import json
+import math
+import os
+import socketserver
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+from lsystem_cache import DiskCache
+from lsystem_core import parse_l_system, generate_l_system
+from raster import Rasterizer, png_bytes
+from task1a import interpret_instructions, plan_l_system, fit_iterations
+from task1b import tree_segments, segment_path, vector_style
+from vector_export import vector_writer
+
+# Допустимый размер изображения в пикселях (точках для svg и eps)
+MIN_SIZE, MAX_SIZE = 16, 8192
+# Память растеризации на пиксель: буфер покрытия float32 и временные
+# массивы Rasterizer.image (float32 и uint8 на три канала) и png_bytes
+RASTER_BYTES_PER_PIXEL = 48
+
+CONTENT_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "eps": "application/postscript",
+}
+
+
+def _entry_size(value):
+    """Примерный размер значения в кэше в байтах."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, str)):
+        return sys.getsizeof(value)
+    return sys.getsizeof(json.dumps(value, ensure_ascii=False))
+
+
+def _number(request, name, default):
+    """Конечное число из параметра запроса name."""
+    value = float(request.get(name, default))
+    if not math.isfinite(value):
+        raise ValueError(f"Параметр {name} должен быть конечным числом: {value}")
+    return value
+
+
+def parse_style(request):
+    """
+    Оформление рисунка из параметров запроса с проверкой и значениями
+    по умолчанию. color — три канала 0-255, списком или строкой "r,g,b".
+    """
+    size = int(request.get("size", 1024))
+    if not MIN_SIZE <= size <= MAX_SIZE:
+        raise ValueError(f"Размер изображения должен быть от {MIN_SIZE} до {MAX_SIZE}: {size}")
+
+    color = request.get("color", (0, 100, 0))
+    if isinstance(color, str):
+        color = color.split(",")
+    color = [int(channel) for channel in color]
+    if len(color) != 3 or not all(0 <= channel <= 255 for channel in color):
+        raise ValueError(f"Цвет должен состоять из трёх каналов от 0 до 255: {color}")
+
+    style = {
+        "size": size,
+        "color": color,
+        "line_width": _number(request, "line_width", 1.0),
+        "initial_thickness": _number(request, "initial_thickness", 5.0),
+        "thickness_decay": _number(request, "thickness_decay", 0.7),
+        "color_transition": _number(request, "color_transition", 0.7),
+        "angle_randomness": _number(request, "angle_randomness", 15.0),
+    }
+    if style["line_width"] <= 0 or style["initial_thickness"] <= 0:
+        raise ValueError("Толщина линий должна быть положительной")
+    if not 0 < style["thickness_decay"] <= 1:
+        raise ValueError(f"thickness_decay должен лежать в (0, 1]: {style['thickness_decay']}")
+    if not 0 <= style["color_transition"] <= 1:
+        raise ValueError(f"color_transition должен лежать в [0, 1]: {style['color_transition']}")
+    if style["angle_randomness"] < 0:
+        raise ValueError(f"angle_randomness не может быть отрицательным: {style['angle_randomness']}")
+    return style
+
+
+class MemoryLRU:
+    """
+    Потокобезопасный LRU-кэш, ограниченный суммарным размером значений.
+
+    При превышении max_bytes вытесняются давно не использованные записи;
+    значение больше max_bytes не сохраняется. Если значение для ключа уже
+    вычисляется в другом потоке, get_or_compute ждёт его, а не считает заново.
+    """
+
+    def __init__(self, max_bytes=256 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.pending = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def _store(self, key, value):
+        size = _entry_size(value)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.size -= evicted
+
+    def get_or_compute(self, key, compute):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            future = self.pending.get(key)
+            owner = future is None
+            if owner:
+                future = self.pending[key] = Future()
+                self.misses += 1
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute()
+        except Exception as error:
+            with self.lock:
+                del self.pending[key]
+            future.set_exception(error)
+            raise
+        with self.lock:
+            self._store(key, value)
+            del self.pending[key]
+        future.set_result(value)
+        return value
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "bytes": self.size, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+class RenderService:
+    """
+    Отрисовка L-систем по запросам с общим кэшем в памяти.
+
+    В одном MemoryLRU лежат разобранные определения (для файлов — с учётом
+    времени изменения), раскрытые строки инструкций и готовые изображения.
+    Запрос — словарь параметров:
+    - definition: текст определения или file: имя файла в каталоге root
+    - iterations, randomness, seed: как у generate_l_system
+    - format: png, svg или eps
+    - kind: curve (ломаная, как в task1a) или tree (дерево из task1b, только svg и eps)
+    - size, line_width, color: размер и оформление ломаной
+    - initial_thickness, thickness_decay, color_transition, angle_randomness: как у draw_fractal_tree
+    Без seed случайные результаты не кэшируются. Запросы, которым по оценке
+    plan_l_system вместе с буфером растеризации нужно больше request_bytes
+    памяти, отклоняются.
+    """
+
+    def __init__(self, root=".", max_bytes=256 * 2 ** 20, request_bytes=2 ** 30):
+        self.root = os.path.realpath(root)
+        self.cache = MemoryLRU(max_bytes)
+        self.request_bytes = request_bytes
+
+    def _cached(self, cacheable, key, compute):
+        return self.cache.get_or_compute(key, compute) if cacheable else compute()
+
+    def definition(self, request):
+        if "definition" in request:
+            text = request["definition"]
+            return self.cache.get_or_compute(("definition", text), lambda: parse_l_system(text))
+
+        if "file" not in request:
+            raise ValueError("Нужно указать definition или file")
+        path = os.path.realpath(os.path.join(self.root, request["file"]))
+        if os.path.commonpath((self.root, path)) != self.root:
+            raise ValueError(f"Файл вне каталога определений: {request['file']}")
+
+        def load():
+            with open(path, encoding="utf-8") as file:
+                return parse_l_system(file.read())
+
+        # Изменённый файл получает новый ключ, старая запись вытесняется со временем
+        modified = os.stat(path).st_mtime_ns
+        return self.cache.get_or_compute(("definition", path, modified), load)
+
+    def render(self, request):
+        """Байты изображения и его формат."""
+        l_system = self.definition(request)
+        iterations = int(request.get("iterations", 4))
+        if iterations < 0:
+            raise ValueError(f"Число итераций не может быть отрицательным: {iterations}")
+        randomness = _number(request, "randomness", 0.0)
+        if not 0 <= randomness <= 1:
+            raise ValueError(f"randomness должна лежать в [0, 1]: {randomness}")
+        seed = None if request.get("seed") is None else int(request["seed"])
+        image_format = request.get("format", "png")
+        kind = request.get("kind", "curve")
+        if image_format not in CONTENT_TYPES:
+            raise ValueError(f"Неизвестный формат: {image_format}")
+        if kind not in ("curve", "tree"):
+            raise ValueError(f"Неизвестный вид рисунка: {kind}")
+
+        style = parse_style(request)
+        # Без случайности раскрытие от seed не зависит
+        expansion = DiskCache.key(l_system, iterations, randomness, seed if randomness > 0 else None)
+
+        raster_bytes = style["size"] ** 2 * RASTER_BYTES_PER_PIXEL if image_format == "png" else 0
+        if raster_bytes > self.request_bytes:
+            raise ValueError(f"Слишком большое изображение: {style['size']} пикселей")
+        plan = plan_l_system(l_system, iterations)
+        if plan["total_bytes"] + raster_bytes > self.request_bytes:
+            fitting = fit_iterations(plan, self.request_bytes - raster_bytes)
+            raise ValueError(f"Слишком много итераций: {iterations}, в память укладывается "
+                             f"не больше {fitting}")
+        random = randomness > 0 or (kind == "tree" and style["angle_randomness"] > 0)
+        cacheable = seed is not None or not random
+
+        def expand():
+            return generate_l_system(l_system["atom"], l_system["rules"], iterations, randomness, seed)
+
+        def draw():
+            instructions = self._cached(randomness == 0 or seed is not None,
+                                        ("expanded", expansion), expand)
+            if kind == "tree":
+                return self.draw_tree(l_system, instructions, iterations, seed, image_format, style)
+            return self.draw_curve(l_system, instructions, image_format, style)
+
+        # seed влияет на рисунок ещё только через отклонения углов дерева
+        jitter_seed = seed if kind == "tree" and style["angle_randomness"] > 0 else None
+        key = ("render", expansion, kind, image_format, jitter_seed, json.dumps(style, sort_keys=True))
+        return self._cached(cacheable, key, draw), image_format
+
+    @staticmethod
+    def draw_curve(l_system, instructions, image_format, style):
+        size = style["size"]
+        color = tuple(style["color"])
+        points, breaks = interpret_instructions(instructions, l_system["angle"],
+                                                l_system["start_direction"])
+        bbox = (*points.min(axis=0), *points.max(axis=0))
+
+        if image_format == "png":
+            rasterizer = Rasterizer(size, size, bbox, color=color)
+            rasterizer.draw(points, breaks)
+            return png_bytes(rasterizer.image())
+
+        buffer = io.StringIO()
+        writer = vector_writer(None, buffer, size, size, bbox, format=image_format)
+        writer.begin_path(color, style["line_width"])
+        writer.draw(points, breaks)
+        writer.end_path()
+        writer.close()
+        return buffer.getvalue().encode("ascii")
+
+    @staticmethod
+    def draw_tree(l_system, instructions, iterations, seed, image_format, style):
+        if image_format == "png":
+            raise ValueError("Дерево выводится только в svg или eps")
+        size = style["size"]
+        segments, depths = tree_segments(instructions, l_system["angle"], l_system["start_direction"],
+                                         angle_randomness=style["angle_randomness"], seed=seed)
+        if len(segments):
+            points = segments.reshape(-1, 2)
+            bbox = (*points.min(axis=0), *points.max(axis=0))
+        else:
+            bbox = (0.0, 0.0, 0.0, 0.0)
+        max_depth = int(depths.max()) if len(depths) else 0
+        palette, thicknesses = vector_style(max_depth, iterations, size, style["initial_thickness"],
+                                            style["thickness_decay"], style["color_transition"])
+
+        buffer = io.StringIO()
+        writer = vector_writer(None, buffer, size, size, bbox, format=image_format)
+        for depth in np.unique(depths):
+            writer.begin_path(tuple(palette[depth].tolist()), float(thicknesses[depth]))
+            writer.draw(*segment_path(segments[depths == depth]))
+            writer.end_path()
+        writer.close()
+        return buffer.getvalue().encode("ascii")
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    """
+    GET /render?file=...&iterations=... или POST /render с параметрами в JSON —
+    изображение; GET /stats — состояние кэша.
+    """
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/stats":
+            self.respond(200, "application/json", json.dumps(self.server.service.cache.stats()).encode())
+        elif url.path == "/render":
+            self.handle_render(dict(parse_qsl(url.query)))
+        else:
+            self.respond(404, "text/plain; charset=utf-8", "Неизвестный путь".encode())
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/render":
+            self.respond(404, "text/plain; charset=utf-8", "Неизвестный путь".encode())
+            return
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            request = json.loads(body or b"{}")
+        except ValueError as error:
+            self.respond(400, "text/plain; charset=utf-8", str(error).encode())
+            return
+        if not isinstance(request, dict):
+            self.respond(400, "text/plain; charset=utf-8", "Параметры должны быть объектом JSON".encode())
+            return
+        self.handle_render(request)
+
+    def handle_render(self, request):
+        # Отрисовка идёт в общем пуле, поток соединения только ждёт результат
+        try:
+            data, image_format = self.server.pool.submit(self.server.service.render, request).result()
+        except FileNotFoundError as error:
+            self.respond(404, "text/plain; charset=utf-8", str(error).encode())
+        except (OSError, ValueError, TypeError, KeyError) as error:
+            # OSError — например, каталог или недоступный файл вместо определения
+            self.respond(400, "text/plain; charset=utf-8", str(error).encode())
+        except Exception as error:
+            self.log_error("Ошибка отрисовки: %r", error)
+            self.respond(500, "text/plain; charset=utf-8", f"Ошибка отрисовки: {error!r}".encode())
+        else:
+            self.respond(200, CONTENT_TYPES[image_format], data)
+
+    def respond(self, status, content_type, data):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # У Unix-сокета адрес клиента пустой
+        return self.client_address[0] if self.client_address else "unix"
+
+
+class UnixRenderServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service, host="127.0.0.1", port=8765, socket_path=None, workers=None):
+    """HTTP-сервер на localhost или на Unix-сокете socket_path с пулом из workers потоков."""
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixRenderServer(socket_path, RenderHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), RenderHandler)
+    server.service = service
+    server.pool = ThreadPoolExecutor(max_workers=workers or os.cpu_count())
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сервер отрисовки L-систем с кэшем в памяти")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", default=None, metavar="ПУТЬ", help="Unix-сокет вместо TCP")
+    parser.add_argument("--root", default=".", help="каталог файлов определений")
+    parser.add_argument("--cache-mb", type=int, default=256, help="размер кэша в мегабайтах")
+    parser.add_argument("--request-mb", type=int, default=1024,
+                        help="наибольшая оценка памяти для одного запроса в мегабайтах")
+    parser.add_argument("--workers", type=int, default=None, help="число потоков отрисовки")
+    args = parser.parse_args()
+
+    service = RenderService(args.root, args.cache_mb * 2 ** 20, args.request_mb * 2 ** 20)
+    server = make_server(service, args.host, args.port, args.socket, args.workers)
+    print(f"Сервер отрисовки: {args.socket or f'http://{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.pool.shutdown()
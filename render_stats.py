@@ -0,0 +1,62 @@
+import time
+from contextlib import contextmanager
+
+# Общий обработчик статистики отрисовок (None — выключен)
+_stats_hook = None
+
+
+def set_stats_hook(hook):
+    """
+    Установка обработчика, которому передаётся статистика каждой отрисовки,
+    например для отправки в свою систему метрик. None отключает передачу.
+    Возвращает предыдущий обработчик.
+    """
+    global _stats_hook
+    previous, _stats_hook = _stats_hook, hook
+    return previous
+
+
+class RenderStats:
+    """
+    Статистика одной отрисовки: длительности стадий (parse, expand, interpret,
+    normalize, render) и размеры результата. Данные лежат в словаре data,
+    который и передаётся обработчикам. Поля, которые отрисовка не может
+    узнать (например, длина строки при случайном ленивом раскрытии),
+    остаются None.
+    """
+
+    def __init__(self, renderer, **fields):
+        self.data = {
+            "renderer": renderer,
+            "stages": {},
+            "instruction_length": None,
+            "segments": None,
+            "max_depth": None,
+            "allocated_bytes": 0,
+        }
+        self.data.update(fields)
+
+    @contextmanager
+    def stage(self, name):
+        """Замер длительности стадии name (повторные замеры складываются)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stages = self.data["stages"]
+            stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+
+    def add_allocation(self, *arrays):
+        """Учёт памяти под основные массивы (и строки) результата."""
+        for array in arrays:
+            if array is None:
+                continue
+            self.data["allocated_bytes"] += getattr(array, "nbytes", None) or len(array)
+
+    def emit(self, hook=None):
+        """Передача статистики обработчику вызова и общему обработчику."""
+        if hook is not None:
+            hook(self.data)
+        if _stats_hook is not None:
+            _stats_hook(self.data)
+        return self.data
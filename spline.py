@@ -0,0 +1,201 @@
+import numpy as np
+
+
+def _solve_natural(x, y):
+    """
+    Коэффициенты естественного кубического сплайна методом прогонки.
+    x, y — массивы формы (n + 1, batch); возвращает массив (n, batch, 4)
+    с коэффициентами a, b, c, d каждого сегмента.
+    Прогонка последовательна по узлам, но каждый шаг выполняется сразу
+    для всего пакета сплайнов.
+    """
+    n = len(x) - 1
+    h = np.diff(x, axis=0)
+    slope = np.diff(y, axis=0) / h
+
+    alpha = np.zeros_like(y[:-1])
+    alpha[1:] = 3 * (slope[1:] - slope[:-1])
+    diagonal = 2 * (x[2:] - x[:-2])
+
+    # Прямой ход: mu[0] = z[0] = 0 (естественное условие c[0] = 0)
+    mu = np.zeros_like(alpha)
+    z = np.zeros_like(alpha)
+    for i in range(1, n):
+        l = diagonal[i - 1] - h[i - 1] * mu[i - 1]
+        mu[i] = h[i] / l
+        z[i] = (alpha[i] - h[i - 1] * z[i - 1]) / l
+
+    # Обратный ход: c[n] = 0
+    c = np.zeros_like(y)
+    for j in range(n - 1, 0, -1):
+        c[j] = z[j] - mu[j] * c[j + 1]
+
+    coefficients = np.empty((n,) + y.shape[1:] + (4,))
+    coefficients[..., 0] = y[:-1]
+    coefficients[..., 1] = slope - h * (c[1:] + 2 * c[:-1]) / 3
+    coefficients[..., 2] = c[:-1]
+    coefficients[..., 3] = (c[1:] - c[:-1]) / (3 * h)
+    return coefficients
+
+
+class NaturalCubicSpline:
+    """
+    Естественный кубический сплайн (вторая производная на концах равна нулю).
+
+    x — узлы формы (n + 1,) или (batch, n + 1), y — значения формы
+    (n + 1,) или (batch, n + 1): так строится сразу пакет сплайнов с общими
+    или собственными узлами. Коэффициенты хранятся одним массивом формы
+    (batch, n, 4): a, b, c, d сегмента i для смещения t = x - x[i].
+
+    Узлы берутся в заданном порядке (как в редакторе, где точки идут
+    в порядке добавления); для вычисления по произвольным x, __call__,
+    они должны возрастать.
+    """
+
+    def __init__(self, x, y):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.batched = y.ndim == 2
+        if y.ndim == 1:
+            y = y[None]
+        # Общие узлы хранятся одной строкой
+        self.shared = x.ndim == 1
+        x = x[None] if self.shared else x
+        if x.shape[1] != y.shape[1] or (not self.shared and x.shape != y.shape) or x.shape[1] < 2:
+            raise ValueError("Нужно не меньше двух узлов одинаковой формы для x и y")
+
+        self.x = np.ascontiguousarray(x)
+        self.coefficients = np.ascontiguousarray(_solve_natural(x.T, y.T).transpose(1, 0, 2))
+
+    def _rows(self):
+        return np.arange(len(self.coefficients))[:, None]
+
+    def _knots(self, index):
+        """Начала сегментов index (batch, m)."""
+        return self.x[0][index] if self.shared else self.x[self._rows(), index]
+
+    def _segments(self, t, index):
+        """Значения сплайнов по номерам сегментов index и смещениям t от их начала (batch, m)."""
+        a, b, c, d = np.moveaxis(self.coefficients[self._rows(), index], -1, 0)
+        return a + t * (b + t * (c + t * d))
+
+    def __call__(self, x):
+        """
+        Значения в точках x (любое их число за один вызов). Сегмент
+        каждой точки ищется через searchsorted; за пределами узлов
+        продолжаются крайние сегменты.
+        x — число, форма (m,) для всех сплайнов пакета или (batch, m).
+        """
+        x = np.asarray(x, dtype=float)
+        scalar = x.ndim == 0
+        x = np.atleast_1d(x)
+        queries = np.broadcast_to(x, (len(self.coefficients),) + x.shape[-1:])
+        last = self.x.shape[1] - 2
+
+        if self.shared:
+            index = np.searchsorted(self.x[0], queries, side="right") - 1
+        else:
+            index = np.stack([np.searchsorted(knots, row, side="right") - 1
+                              for knots, row in zip(self.x, queries)])
+        index = np.clip(index, 0, last)
+        values = self._segments(queries - self._knots(index), index)
+        if scalar:
+            values = values[:, 0]
+        return values if self.batched else values[0]
+
+    def sample(self, samples=20, segments=None):
+        """
+        Точки кривой: по samples равномерных точек на каждом сегменте от x[i]
+        до x[i + 1] (концы сегментов повторяются, как у соседних отрезков).
+        segments — номера сегментов, если нужны не все.
+        Возвращает массив (m * samples, 2) или (batch, m * samples, 2).
+        """
+        if segments is None:
+            segments = np.arange(self.x.shape[1] - 1)
+        segments = np.asarray(segments, dtype=np.int64)
+        t = np.linspace(0.0, 1.0, samples)
+        h = self.x[:, segments + 1] - self.x[:, segments]
+
+        shape = (len(self.coefficients), len(segments) * samples)
+        offsets = np.broadcast_to((h[:, :, None] * t).reshape(len(self.x), -1), shape)
+        x = np.repeat(self.x[:, segments], samples, axis=1) + offsets
+        index = np.broadcast_to(np.repeat(segments, samples), shape)
+
+        points = np.stack((x, self._segments(offsets, index)), axis=-1)
+        return points if self.batched else points[0]
+
+    def changed_segments(self, other, coefficients=None, tolerance=1e-9):
+        """
+        Номера сегментов, на которых сплайн отличается от other (с тем же
+        числом узлов) больше чем на tolerance. Оценка сверху по разности
+        коэффициентов: |da| + |db| h + |dc| h² + |dd| h³, плюс сегменты
+        со сдвинутыми узлами. coefficients заменяют коэффициенты other.
+        """
+        if coefficients is None:
+            coefficients = other.coefficients
+        h = np.abs(np.diff(self.x, axis=1))[..., None] ** np.arange(4)
+        bound = (np.abs(self.coefficients - coefficients) * h).sum(axis=-1)
+        moved = (self.x[:, :-1] != other.x[:, :-1]) | (self.x[:, 1:] != other.x[:, 1:])
+        return np.flatnonzero(((bound > tolerance) | moved).any(axis=0))
+
+    def segment_counts(self, tolerance=0.5, scale=(1.0, 1.0), max_vertices=None):
+        """
+        Число отрезков ломаной на каждом сегменте (batch, n), при котором
+        ломаная отходит от кривой не больше чем на tolerance пикселей.
+        scale — пикселей на единицу по x и y. Отклонение хорды длины dx
+        от кривой не больше dx² / 8 * max|y''|, а y'' = 2c + 6dt линейна,
+        так что её максимум берётся на концах сегмента.
+        max_vertices — ограничение на число вершин всей кривой: если его не
+        хватает, число отрезков на сегментах уменьшается пропорционально
+        и точность соответственно падает.
+        """
+        h = np.abs(np.diff(self.x, axis=1))
+        c, d = self.coefficients[..., 2], self.coefficients[..., 3]
+        curvature = np.maximum(np.abs(2 * c), np.abs(2 * c + 6 * d * h))
+
+        counts = np.ceil(h * np.sqrt(curvature * scale[1] / (8 * tolerance)))
+        counts = np.maximum(counts, 1)
+        if max_vertices is not None:
+            total = counts.sum(axis=-1, keepdims=True) + 1
+            factor = np.minimum(1.0, (max_vertices - 1) / (total - 1))
+            counts = np.maximum(np.floor(counts * factor), 1)
+        return counts.astype(np.int64)
+
+    def sample_intervals(self, counts, segments=None, row=0):
+        """
+        Точки сегментов segments сплайна row, разбитых на counts[i] равных
+        частей, без конечной точки каждого сегмента (она начинает следующий).
+        counts — числа частей для всех сегментов (n,) этого сплайна.
+        """
+        knots = self.x[0 if self.shared else row]
+        if segments is None:
+            segments = np.arange(len(knots) - 1)
+        segments = np.asarray(segments, dtype=np.int64)
+        counts = np.asarray(counts)[segments]
+
+        index = np.repeat(segments, counts)
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        fraction = (np.arange(len(index)) - first) / np.repeat(counts, counts)
+        t = (knots[index + 1] - knots[index]) * fraction
+
+        a, b, c, d = self.coefficients[row, index].T
+        return np.column_stack((knots[index] + t, a + t * (b + t * (c + t * d))))
+
+    def end_points(self):
+        """Последние точки кривых (batch, 2)."""
+        h = self.x[:, -1] - self.x[:, -2]
+        y = (self.coefficients[:, -1] * h[:, None] ** np.arange(4)).sum(axis=-1)
+        return np.column_stack((np.broadcast_to(self.x[:, -1], y.shape), y))
+
+    def sample_adaptive(self, tolerance=0.5, scale=(1.0, 1.0), max_vertices=None):
+        """
+        Точки кривой с плотностью по кривизне сегментов (см. segment_counts):
+        почти прямые участки получают мало вершин, крутые изгибы — больше.
+        Возвращает массив (m, 2), для пакета — список таких массивов
+        (число точек у сплайнов разное).
+        """
+        counts = self.segment_counts(tolerance, scale, max_vertices)
+        ends = self.end_points()
+        curves = [np.concatenate((self.sample_intervals(counts[row], row=row), ends[row:row + 1]))
+                  for row in range(len(counts))]
+        return curves if self.batched else curves[0]
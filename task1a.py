@@ -1,108 +1,56 @@
 import matplotlib.pyplot as plt
 import numpy as np
-import random
+import math
 import os
+import glob
+import time
+import argparse
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
 
+from lsystem_core import (REWRITE_CHUNK, read_l_system_from_file, generate_l_system, iter_l_system,
+                          encode_string)
+from raster import Rasterizer
+from random_streams import seed_sequence
+from render_stats import RenderStats
+from vector_export import vector_writer
 
-def read_l_system_from_file(filename):
+
+def iter_turtle_chunks(symbols, angle, direction=0.0, step_length=1.0, chunk_size=65536):
     """
-    Чтение L-системы из текстового файла
-    Формат файла:
-    <атом> <угол поворота> <начальное направление>
-    <правило №1>
-    <правило №2>
-    ...
+    Посимвольная интерпретация черепахой с выдачей вершин частями
+    по chunk_size (массив вершин и маска breaks, см. walk_turtle).
+    Принимает любую последовательность символов, в том числе генератор
+    iter_l_system, так что вершины можно обрабатывать по мере появления.
     """
-    l_system = {
-        "atom": "",
-        "rules": {},
-        "angle": 0,
-        "start_direction": 0
-    }
-
-    try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            lines = [line.strip() for line in file.readlines() if line.strip()]
-
-        if len(lines) < 2:
-            raise ValueError("Файл должен содержать как минимум 2 строки")
-
-        first_line = lines[0].split()
-        l_system["atom"] = first_line[0]
-        l_system["angle"] = float(first_line[1])
-        l_system["start_direction"] = float(first_line[2]) if len(first_line) > 2 else 0
-
-        for line in lines[1:]:
-            if '→' in line:
-                key, value = line.split('→', 1)
-            elif '=' in line:
-                key, value = line.split('=', 1)
-            else:
-                parts = line.split(':', 1)
-                if len(parts) == 2:
-                    key, value = parts
-                else:
-                    continue
-
-            l_system["rules"][key.strip()] = value.strip()
-
-    except Exception as e:
-        print(f"Ошибка при чтении файла {filename}: {e}")
-        return None
-
-    return l_system
-
-
-def generate_l_system(axiom, rules, iterations, randomness=0.0):
-    current_string = axiom
-
-    for _ in range(iterations):
-        result = []
-        for char in current_string:
-            if char in rules:
-                # Добавление случайности
-                if randomness > 0 and random.random() < randomness:
-                    result.append(char) #Сохраняется исходный символ
-                else:
-                    result.append(rules[char]) #Применяется правило
-            else:
-                result.append(char)
-        current_string = "".join(result)
-
-    return current_string
-
-
-def points_l_system(l_system, iterations=4, randomness=0.0, step_length=1.0):
-    axiom = l_system["atom"]
-    angle = l_system["angle"]
-    direction = l_system["start_direction"]
-    rules = l_system["rules"]
-
-    instructions = generate_l_system(axiom, rules, iterations, randomness)
-
-    x, y = 0, 0
+    x, y = 0.0, 0.0
     stack = []
     points = [(x, y)]
+    breaks = [False]
     current_angle = np.radians(direction)
+    turn = np.radians(angle)
 
-    for char in instructions:
+    for char in symbols:
         if char == "F" or char == "G":
             # Двигаемся вперед
-            x_new = x + np.sin(current_angle) * step_length
-            y_new = y + np.cos(current_angle) * step_length
-            points.append((x_new, y_new))
-            x, y = x_new, y_new
+            x += math.sin(current_angle) * step_length
+            y += math.cos(current_angle) * step_length
+            points.append((x, y))
+            breaks.append(False)
+            if len(points) >= chunk_size:
+                yield np.array(points, dtype=float), np.array(breaks, dtype=bool)
+                points, breaks = [], []
         elif char == "f" or char == "g":
             # Перемещаемся без рисования
-            x_new = x + np.sin(current_angle) * step_length
-            y_new = y + np.cos(current_angle) * step_length
-            x, y = x_new, y_new
+            x += math.sin(current_angle) * step_length
+            y += math.cos(current_angle) * step_length
         elif char == "+":
             # Поворачиваем вправо
-            current_angle -= np.radians(angle)
+            current_angle -= turn
         elif char == "-":
             # Поворачиваем влево
-            current_angle += np.radians(angle)
+            current_angle += turn
         elif char == "[":
             # Сохраняем текущую позицию и угол (начало ветвления)
             stack.append((x, y, current_angle))
@@ -111,31 +59,787 @@ def points_l_system(l_system, iterations=4, randomness=0.0, step_length=1.0):
             if stack:
                 x, y, current_angle = stack.pop()
                 points.append((x, y))
+                breaks.append(True)
+                if len(points) >= chunk_size:
+                    yield np.array(points, dtype=float), np.array(breaks, dtype=bool)
+                    points, breaks = [], []
+
+    if points:
+        yield np.array(points, dtype=float), np.array(breaks, dtype=bool)
+
+
+def walk_turtle(symbols, angle, direction=0.0, step_length=1.0):
+    """
+    Посимвольная интерпретация черепахой. Принимает любую последовательность
+    символов (в том числе генератор iter_l_system).
+    Возвращает массив вершин и маску breaks: True у вершин, в которые черепаха
+    вернулась по "]" (переход к ним не является отрезком фигуры).
+    """
+    chunks = list(iter_turtle_chunks(symbols, angle, direction, step_length))
+    return (np.concatenate([points for points, _ in chunks]),
+            np.concatenate([breaks for _, breaks in chunks]))
+
+
+def _restore_cumsum(values, open_nodes, close_nodes):
+    """
+    Накопленная сумма values с откатом по скобкам: в узле парной "]" значение
+    возвращается к значению в узле "[". close_nodes отсортированы по возрастанию.
+
+    Поправка C к обычной cumsum T постоянна между "]" и для каждой "]"
+    выражается через поправку предыдущей "]" перед парной "[":
+    C[close] = C[предыдущая] + T[close] - T[open]. Эти связи образуют дерево
+    только по скобкам, которое сворачивается удвоением указателей.
+    """
+    total = np.cumsum(values, axis=0)
+    if len(close_nodes) == 0:
+        return total
+
+    correction = total[close_nodes] - total[open_nodes]
+    pointer = np.searchsorted(close_nodes, open_nodes) - 1
+    active = np.flatnonzero(pointer >= 0)
+
+    while active.size:
+        target = pointer[active]
+        correction[active] += correction[target]
+        pointer[active] = pointer[target]
+        active = active[pointer[active] >= 0]
+
+    # Номер последней "]" не позже каждого узла
+    last_close = np.full(len(values), -1, dtype=np.int64)
+    last_close[close_nodes] = np.arange(len(close_nodes))
+    last_close = np.maximum.accumulate(last_close)
+
+    applied = last_close >= 0
+    total[applied] -= correction[last_close[applied]]
+    return total
+
+
+# Классы символов для векторной интерпретации
+_OTHER, _DRAW, _MOVE, _RIGHT, _LEFT, _OPEN, _CLOSE = range(7)
+_SYMBOL_CLASSES = np.zeros(256, dtype=np.uint8)
+for _char, _kind in (("F", _DRAW), ("G", _DRAW), ("f", _MOVE), ("g", _MOVE),
+                     ("+", _RIGHT), ("-", _LEFT), ("[", _OPEN), ("]", _CLOSE)):
+    _SYMBOL_CLASSES[ord(_char)] = _kind
+
+
+def _encode_symbols(instructions):
+    """Массив классов символов (_DRAW, _MOVE, ...) для строки инструкций."""
+    codes = encode_string(instructions)
+    if codes.dtype != np.uint8:
+        # Символы вне таблицы классов — прочие (код 0)
+        codes = np.where(codes < len(_SYMBOL_CLASSES), codes, 0)
+    return _SYMBOL_CLASSES[codes]
+
+
+def _match_brackets(opens, closes):
+    """
+    Сопоставление скобок по позициям "[" и "]" (оба массива по возрастанию).
+    "]" при пустом стеке игнорируется, незакрытые "[" остаются без пары.
+    Возвращает позиции парных "[" и "]", отсортированные по "]",
+    и наибольшую глубину стека.
+    """
+    brackets = np.concatenate((opens, closes))
+    is_close = np.concatenate((np.zeros(len(opens), dtype=bool), np.ones(len(closes), dtype=bool)))
+    order = np.argsort(brackets, kind="stable")
+    brackets, is_close = brackets[order], is_close[order]
+
+    # Глубина стека после каждой скобки с учётом игнорируемых "]"
+    depth = np.cumsum(np.where(is_close, -1, 1))
+    floor = np.minimum.accumulate(np.minimum(depth, 0))
+    previous_floor = np.concatenate(([0], floor[:-1]))
+    valid = ~is_close | (floor == previous_floor)
+    brackets, is_close, depth = brackets[valid], is_close[valid], (depth - floor)[valid]
+
+    # Внутри одного уровня вложенности "[" и "]" чередуются
+    level = depth + is_close
+    order = np.argsort(level, kind="stable")
+    brackets, level, is_close = brackets[order], level[order], is_close[order]
+    paired = ~is_close[:-1] & is_close[1:] & (level[:-1] == level[1:])
+    open_pos, close_pos = brackets[:-1][paired], brackets[1:][paired]
+
+    max_depth = int(level.max()) if len(level) else 0
+
+    order = np.argsort(close_pos)
+    return open_pos[order], close_pos[order], max_depth
+
+
+def interpret_instructions(instructions, angle, direction=0.0, step_length=1.0, stats=None):
+    """
+    Векторная интерпретация строки инструкций (тот же результат, что и у walk_turtle).
+
+    Символы кодируются массивом, курс и позиция считаются накопленными суммами,
+    а возвраты по "]" применяются разом: скобки сопоставляются сортировкой
+    по уровню вложенности, и к суммам добавляются поправки (см. _restore_cumsum).
+    Суммы считаются только по значимым символам: поворотам для курса
+    и перемещениям для позиции.
+    stats — словарь, в который записываются число отрезков и наибольшая
+    глубина стека ветвлений.
+    """
+    kinds = _encode_symbols(instructions)
+
+    opens = np.flatnonzero(kinds == _OPEN)
+    open_pos, close_pos, max_depth = _match_brackets(opens, np.flatnonzero(kinds == _CLOSE))
+    restore = np.zeros(len(kinds), dtype=bool)
+    restore[close_pos] = True
+
+    # Курс: сумма поворотов (в единицах угла) по поворотам и скобкам
+    events = np.flatnonzero((kinds == _RIGHT) | (kinds == _LEFT) | (kinds == _OPEN) | restore)
+    steps = np.zeros(len(events) + 1, dtype=np.int64)
+    steps[1:][kinds[events] == _LEFT] = 1
+    steps[1:][kinds[events] == _RIGHT] = -1
+    turns = _restore_cumsum(steps, np.searchsorted(events, open_pos) + 1,
+                            np.searchsorted(events, close_pos) + 1)
+
+    # Позиция: сумма смещений по перемещениям и скобкам
+    moves = np.flatnonzero((kinds == _DRAW) | (kinds == _MOVE))
+    move_turns = turns[np.searchsorted(events, moves, side="right")]
+    if len(moves):
+        low, high = int(move_turns.min()), int(move_turns.max())
+    else:
+        low, high = 0, 0
+    # Различных курсов немного: синусы и косинусы берутся из таблицы
+    headings = np.radians(direction) + np.arange(low, high + 1) * np.radians(angle)
+    directions = np.column_stack((np.sin(headings), np.cos(headings))) * step_length
+
+    events = np.flatnonzero((kinds == _DRAW) | (kinds == _MOVE) | (kinds == _OPEN) | restore)
+    offsets = np.zeros((len(events) + 1, 2))
+    offsets[1:][np.isin(kinds[events], (_DRAW, _MOVE))] = directions[move_turns - low]
+    positions = _restore_cumsum(offsets, np.searchsorted(events, open_pos) + 1,
+                                np.searchsorted(events, close_pos) + 1)[1:]
+
+    emitted = (kinds[events] == _DRAW) | restore[events]
+    count = int(np.count_nonzero(emitted))
+
+    points = np.empty((count + 1, 2))
+    points[0] = 0.0
+    points[1:] = positions[emitted]
+    breaks = np.empty(count + 1, dtype=bool)
+    breaks[0] = False
+    breaks[1:] = restore[events][emitted]
 
+    if stats is not None:
+        stats["segments"] = int(np.count_nonzero(~breaks[1:]))
+        stats["max_depth"] = max_depth
+
+    return points, breaks
+
+
+def _turn_period(angle):
+    """Через сколько поворотов на angle курс повторяется (None — если слишком нескоро)."""
+    period = (Fraction(str(angle)) / 360).denominator
+    return period if period <= 3600 else None
+
+
+class GeometryCache:
+    """
+    Кэш геометрии подраскрытий детерминированной L-системы.
+
+    Раскрытие символа на глубину depth при одном и том же курсе всегда даёт
+    один и тот же путь, отличающийся только сдвигом. Поэтому для ключа
+    (символ, оставшаяся глубина, курс) хранится смещение, изменение курса
+    (в поворотах на угол), охватывающий прямоугольник выведенных точек,
+    число отрезков и точек, а для небольших раскрытий — сам блок вершин.
+    Курс хранится по модулю периода поворотов, так что работа пропорциональна
+    правила × глубина × число различных курсов.
+    """
+
+    def __init__(self, l_system, step_length=1.0, block_limit=4096):
+        self.axiom = l_system["atom"]
+        self.rules = l_system["rules"]
+        self.angle = l_system["angle"]
+        self.direction = l_system["start_direction"]
+        self.step_length = step_length
+        self.block_limit = block_limit
+        self.period = _turn_period(self.angle)
+
+        for key, body in self.rules.items():
+            depth = 0
+            for char in body:
+                depth += (char == "[") - (char == "]")
+                if depth < 0:
+                    break
+            if depth != 0:
+                raise ValueError(f"Скобки в правиле {key} → {body} не сбалансированы")
+
+        self._geometry = {}
+        self._blocks = {}
+
+    def _key(self, symbol, depth, turns):
+        if symbol not in self.rules:
+            depth = 0
+        if self.period is not None:
+            turns %= self.period
+        return symbol, depth, turns
+
+    def _heading(self, turns):
+        return math.radians(self.direction) + turns * math.radians(self.angle)
+
+    def _primitive(self, symbol, turns):
+        """Геометрия одного символа, который больше не раскрывается."""
+        geometry = {"displacement": (0.0, 0.0), "turns": 0, "bbox": None,
+                    "segments": 0, "points": 0}
+        if symbol in "FGfg":
+            heading = self._heading(turns)
+            dx = math.sin(heading) * self.step_length
+            dy = math.cos(heading) * self.step_length
+            geometry["displacement"] = (dx, dy)
+            if symbol in "FG":
+                geometry.update(bbox=(dx, dy, dx, dy), segments=1, points=1)
+        elif symbol == "+":
+            geometry["turns"] = -1
+        elif symbol == "-":
+            geometry["turns"] = 1
+        return geometry
+
+    def geometry(self, symbol, depth, turns=0):
+        """Геометрия раскрытия symbol на depth итераций при курсе turns (относительно начала)."""
+        key = self._key(symbol, depth, turns)
+        cached = self._geometry.get(key)
+        if cached is None:
+            symbol, depth, turns = key
+            if depth == 0:
+                cached = self._primitive(symbol, turns)
+            else:
+                cached = self._compose(self.rules[symbol], depth - 1, turns)
+            self._geometry[key] = cached
+        return cached
+
+    def _compose(self, body, depth, turns):
+        """Геометрия строки body, каждый символ которой раскрывается на depth итераций."""
+        x, y, heading = 0.0, 0.0, 0
+        bbox = None
+        segments = points = 0
+        stack = []
+
+        for char in body:
+            if char == "[":
+                stack.append((x, y, heading))
+                continue
+            if char == "]":
+                if stack:
+                    x, y, heading = stack.pop()
+                    bbox = _merge_bbox(bbox, (x, y, x, y))
+                    points += 1
+                continue
+
+            child = self.geometry(char, depth, turns + heading)
+            if child["bbox"] is not None:
+                xmin, ymin, xmax, ymax = child["bbox"]
+                bbox = _merge_bbox(bbox, (x + xmin, y + ymin, x + xmax, y + ymax))
+            dx, dy = child["displacement"]
+            x, y = x + dx, y + dy
+            heading += child["turns"]
+            segments += child["segments"]
+            points += child["points"]
+
+        return {"displacement": (x, y), "turns": heading, "bbox": bbox,
+                "segments": segments, "points": points}
+
+    def summary(self, iterations):
+        """
+        Геометрия всей L-системы после iterations итераций: охватывающий
+        прямоугольник точек points_l_system (включая начало), длина пути,
+        число отрезков и точек.
+        """
+        geometry = self._compose(self.axiom, iterations, 0)
+        return {
+            "bbox": _merge_bbox(geometry["bbox"], (0.0, 0.0, 0.0, 0.0)),
+            "displacement": geometry["displacement"],
+            "path_length": geometry["segments"] * self.step_length,
+            "segments": geometry["segments"],
+            "points": geometry["points"] + 1,
+        }
+
+    def block(self, symbol, depth, turns=0):
+        """
+        Вершины раскрытия относительно его начала и маска возвратов по "]"
+        (как у walk_turtle, но без начальной точки). Блоки до block_limit
+        вершин кэшируются и переиспользуются со сдвигом.
+        """
+        key = self._key(symbol, depth, turns)
+        cached = self._blocks.get(key)
+        if cached is not None:
+            return cached
+
+        symbol, depth, turns = key
+        if depth == 0:
+            geometry = self._primitive(symbol, turns)
+            points = np.array([geometry["displacement"]]) if geometry["points"] else np.empty((0, 2))
+            block = points, np.zeros(len(points), dtype=bool)
+        else:
+            block = self._assemble(self.rules[symbol], depth - 1, turns)
+
+        if len(block[0]) <= self.block_limit:
+            self._blocks[key] = block
+        return block
+
+    def _assemble(self, body, depth, turns):
+        """Вершины строки body, собранные из блоков её символов со сдвигами."""
+        x, y, heading = 0.0, 0.0, 0
+        pieces, breaks = [], []
+        stack = []
+
+        for char in body:
+            if char == "[":
+                stack.append((x, y, heading))
+                continue
+            if char == "]":
+                if stack:
+                    x, y, heading = stack.pop()
+                    pieces.append(np.array([[x, y]]))
+                    breaks.append(np.ones(1, dtype=bool))
+                continue
+
+            points, restored = self.block(char, depth, turns + heading)
+            if len(points):
+                pieces.append(points + (x, y))
+                breaks.append(restored)
+            child = self.geometry(char, depth, turns + heading)
+            dx, dy = child["displacement"]
+            x, y = x + dx, y + dy
+            heading += child["turns"]
+
+        if not pieces:
+            return np.empty((0, 2)), np.zeros(0, dtype=bool)
+        return np.concatenate(pieces), np.concatenate(breaks)
+
+    def points(self, iterations):
+        """Точки и маска возвратов, совпадающие с points_l_system(..., return_breaks=True)."""
+        points, breaks = self._assemble(self.axiom, iterations, 0)
+        return (np.concatenate(([[0.0, 0.0]], points)),
+                np.concatenate(([False], breaks)))
+
+    def viewport_points(self, iterations, viewport, pixel_size):
+        """
+        Точки только видимой части фигуры в координатах черепахи.
+
+        viewport — прямоугольник (xmin, ymin, xmax, ymax). Подраскрытия, чей
+        охватывающий прямоугольник не пересекает его, пропускаются целиком
+        (черепаха лишь смещается на их итоговое смещение), а подраскрытия
+        меньше pixel_size заменяются одним отрезком до их конца. Поэтому
+        работа пропорциональна видимой части, а не длине всей строки.
+        breaks[i] = True — к точке i черепаха перешла без рисования.
+        """
+        xmin, ymin, xmax, ymax = viewport
+        # Запас в пиксель, чтобы не терять отрезки на границе
+        view = (xmin - pixel_size, ymin - pixel_size, xmax + pixel_size, ymax + pixel_size)
+        state = {"x": 0.0, "y": 0.0, "moved": True, "points": [], "breaks": []}
+        self._cull(self.axiom, iterations, 0, view, pixel_size, state)
+        return (np.array(state["points"], dtype=float).reshape(-1, 2),
+                np.array(state["breaks"], dtype=bool))
+
+    def _cull(self, body, depth, turns, view, pixel_size, state):
+        """Обход строки body с раскрытием символов на depth итераций (см. viewport_points)."""
+        points, breaks = state["points"], state["breaks"]
+        stack = []
+
+        def line_to(x, y):
+            if state["moved"]:
+                points.append((state["x"], state["y"]))
+                breaks.append(True)
+                state["moved"] = False
+            points.append((x, y))
+            breaks.append(False)
+
+        for char in body:
+            if char == "[":
+                stack.append((state["x"], state["y"], turns))
+                continue
+            if char == "]":
+                if stack:
+                    state["x"], state["y"], turns = stack.pop()
+                    state["moved"] = True
+                continue
+
+            x, y = state["x"], state["y"]
+            child = self.geometry(char, depth, turns)
+            dx, dy = child["displacement"]
+
+            if child["bbox"] is not None:
+                bxmin, bymin, bxmax, bymax = child["bbox"]
+                bxmin, bymin = min(bxmin, 0.0) + x, min(bymin, 0.0) + y
+                bxmax, bymax = max(bxmax, 0.0) + x, max(bymax, 0.0) + y
+                if bxmax < view[0] or bxmin > view[2] or bymax < view[1] or bymin > view[3]:
+                    state["moved"] = True
+                elif char not in self.rules or depth == 0 or \
+                        max(bxmax - bxmin, bymax - bymin) < pixel_size:
+                    line_to(x + dx, y + dy)
+                else:
+                    self._cull(self.rules[char], depth - 1, turns, view, pixel_size, state)
+
+            state["x"], state["y"] = x + dx, y + dy
+            turns += child["turns"]
+
+
+def _merge_bbox(first, second):
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return (min(first[0], second[0]), min(first[1], second[1]),
+            max(first[2], second[2]), max(first[3], second[3]))
+
+
+def points_l_system(l_system, iterations=4, randomness=0.0, step_length=1.0, lazy=False,
+                    return_breaks=False, cache=None, seed=None):
+    """
+    lazy=True — символы берутся из iter_l_system по одному, без построения
+    полной строки инструкций в памяти.
+    return_breaks=True — вернуть также маску возвратов по "]" (см. walk_turtle).
+    cache — GeometryCache этой L-системы: при randomness=0 точки собираются
+    из закэшированных блоков подраскрытий, без строки инструкций. Длина шага
+    кэша должна совпадать с step_length.
+    seed — зерно случайных решений (см. generate_l_system).
+    """
+    axiom = l_system["atom"]
+    angle = l_system["angle"]
+    direction = l_system["start_direction"]
+    rules = l_system["rules"]
+
+    if cache is not None and randomness == 0:
+        if cache.step_length != step_length:
+            raise ValueError(f"Длина шага кэша {cache.step_length} не совпадает с step_length {step_length}")
+        points, breaks = cache.points(iterations)
+    elif lazy:
+        symbols = iter_l_system(axiom, rules, iterations, randomness, seed)
+        points, breaks = walk_turtle(symbols, angle, direction, step_length)
+    else:
+        instructions = generate_l_system(axiom, rules, iterations, randomness, seed)
+        points, breaks = interpret_instructions(instructions, angle, direction, step_length)
+
+    if return_breaks:
+        return points, breaks
     return points
 
 
-def normalize_points(points):
-    if not points:
+def normalize_points(points, bbox=None):
+    """
+    Сдвиг точек в начало координат и масштабирование в [0, 1].
+    bbox — заранее известный охватывающий прямоугольник (например,
+    из GeometryCache.summary), чтобы не искать минимум и максимум.
+    """
+    if len(points) == 0:
         return points
 
-    points = np.array(points)
+    points = np.array(points, dtype=float)
 
-    points -= points.min(axis=0)
+    if bbox is None:
+        points -= points.min(axis=0)
+        max_val = points.max()
+    else:
+        points -= bbox[:2]
+        max_val = max(bbox[2] - bbox[0], bbox[3] - bbox[1])
 
-    max_val = points.max()
     if max_val > 0:
         points /= max_val
 
     return points
 
 
-def draw_l_system_from_file(filename, iterations=4, randomness=0.0, step_length=1.0):
-    l_system = read_l_system_from_file(filename)
+def _decimation_mask(points, breaks, tolerance):
+    """
+    Маска вершин, которые остаются после прореживания: удаляются повторы,
+    внутренние вершины прямолинейных участков и вершины внутри серий,
+    попадающих в одну ячейку сетки с шагом tolerance (субпиксельные отрезки).
+    Первая и последняя вершины, а также вершины на разрывах сохраняются.
+    """
+    n = len(points)
+    keep = np.ones(n, dtype=bool)
+    if n < 3:
+        return keep
+
+    # Вершина на конце куска ломаной (перед разрывом) и в его начале не удаляются
+    fixed = breaks.copy()
+    fixed[:-1] |= breaks[1:]
+    fixed[0] = fixed[-1] = True
+
+    # Повторы подряд
+    same = np.zeros(n, dtype=bool)
+    same[1:] = np.all(points[1:] == points[:-1], axis=1)
+    keep &= ~(same & ~fixed)
+
+    current = np.flatnonzero(keep)
+    kept, kept_fixed = points[current], fixed[current]
+
+    # Прямолинейные участки: одинаковое направление соседних отрезков
+    before = kept[1:-1] - kept[:-2]
+    after = kept[2:] - kept[1:-1]
+    cross = before[:, 0] * after[:, 1] - before[:, 1] * after[:, 0]
+    dot = np.einsum("ij,ij->i", before, after)
+    scale = np.hypot(before[:, 0], before[:, 1]) * np.hypot(after[:, 0], after[:, 1])
+    straight = (np.abs(cross) <= 1e-9 * scale) & (dot > 0)
+    keep[current[1:-1][straight & ~kept_fixed[1:-1]]] = False
+
+    if tolerance > 0:
+        current = np.flatnonzero(keep)
+        cells = np.floor(points[current] / tolerance).astype(np.int64)
+        inner = np.all(cells[1:-1] == cells[:-2], axis=1) & np.all(cells[1:-1] == cells[2:], axis=1)
+        keep[current[1:-1][inner & ~fixed[current[1:-1]]]] = False
+
+    return keep
+
+
+def _douglas_peucker(points, tolerance):
+    """Маска вершин ломаной, оставленных алгоритмом Дугласа — Пекера."""
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    ranges = [(0, len(points) - 1)]
+
+    while ranges:
+        start, end = ranges.pop()
+        if end - start < 2:
+            continue
+        chord = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        length = math.hypot(chord[0], chord[1])
+        if length > 0:
+            distances = np.abs(chord[0] * offsets[:, 1] - chord[1] * offsets[:, 0]) / length
+        else:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            middle = start + 1 + farthest
+            keep[middle] = True
+            ranges.append((start, middle))
+            ranges.append((middle, end))
+
+    return keep
+
+
+def simplify_path(points, breaks=None, resolution=1024, douglas_peucker=False):
+    """
+    Прореживание ломаной для вывода с разрешением resolution пикселей
+    на единицу координат (для точек после normalize_points это размер
+    изображения). Сливаются прямолинейные участки, отбрасываются
+    субпиксельные отрезки, а при douglas_peucker=True ломаная дополнительно
+    упрощается с допуском в пиксель. Возвращает точки и маску разрывов.
+    """
+    points = np.asarray(points, dtype=float)
+    breaks = np.zeros(len(points), dtype=bool) if breaks is None else np.asarray(breaks, dtype=bool)
+    tolerance = 1.0 / resolution if resolution else 0.0
+
+    keep = _decimation_mask(points, breaks, tolerance)
+    points, breaks = points[keep], breaks[keep]
+
+    if douglas_peucker and len(points) > 2:
+        keep = np.zeros(len(points), dtype=bool)
+        starts = np.flatnonzero(breaks)
+        bounds = np.concatenate(([0], starts[starts > 0], [len(points)]))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            keep[start:end] = _douglas_peucker(points[start:end], tolerance)
+        points, breaks = points[keep], breaks[keep]
+
+    return points, breaks
+
+
+def iter_simplified(chunks, resolution=1024, douglas_peucker=False):
+    """
+    Потоковое прореживание частей ломаной (пар точки, маска разрывов),
+    например из iter_points_l_system. Последняя вершина каждой части
+    придерживается до следующей, чтобы решения на стыке учитывали обе стороны;
+    уже выданная вершина служит контекстом и повторно не выдаётся.
+    """
+    context = None
+    pending = None
+
+    for points, breaks in chunks:
+        parts = [part for part in (context, pending, (points, breaks)) if part is not None]
+        buffer = np.concatenate([part[0] for part in parts])
+        buffer_breaks = np.concatenate([part[1] for part in parts])
+        if len(buffer) < 3:
+            pending = (buffer[int(context is not None):], buffer_breaks[int(context is not None):])
+            continue
+
+        simplified, simplified_breaks = simplify_path(buffer, buffer_breaks, resolution, douglas_peucker)
+        first = 1 if context is not None else 0
+        if len(simplified) - 1 > first:
+            yield simplified[first:-1], simplified_breaks[first:-1]
+            context = (simplified[-2:-1], simplified_breaks[-2:-1])
+        pending = (simplified[-1:], simplified_breaks[-1:])
+
+    if pending is not None and len(pending[0]):
+        yield pending
+
+
+def _bracket_profile(symbols, children):
+    """
+    Изменение глубины стека и её максимум (относительно начала) для строки,
+    символы которой заменяются готовыми профилями children.
+    """
+    net, peak = 0, 0
+    for char in symbols:
+        child_net, child_peak = children(char)
+        peak = max(peak, net + child_peak)
+        net += child_net
+    return net, peak
+
+
+def plan_l_system(l_system, iterations=4):
+    """
+    Оценка размера результата без генерации строки.
+
+    Для каждой итерации по матрице роста (сколько раз символ b входит в правило
+    для символа a) считаются количества символов, длина строки, число отрезков,
+    точек и максимальная глубина стека ветвлений, а также память под строку
+    и массивы точек. Оценка дана для детерминированного раскрытия (randomness=0).
+    """
+    axiom = l_system["atom"]
+    rules = l_system["rules"]
+
+    alphabet = sorted(set(axiom).union(*rules.values(), *rules.keys()))
+    index = {char: i for i, char in enumerate(alphabet)}
+
+    growth = np.zeros((len(alphabet), len(alphabet)), dtype=object)
+    for char in alphabet:
+        if char in rules:
+            for child in rules[char]:
+                growth[index[char], index[child]] += 1
+        else:
+            growth[index[char], index[char]] = 1
+
+    counts = np.zeros(len(alphabet), dtype=object)
+    for char in axiom:
+        counts[index[char]] += 1
+
+    # Байт на символ в строке Python зависит от самого "широкого" символа
+    widest = max((ord(char) for char in alphabet), default=0)
+    char_bytes = 1 if widest < 256 else 2 if widest < 65536 else 4
+
+    # Профили глубины стека для символов на каждом уровне раскрытия
+    terminal = {"[": (1, 1), "]": (-1, 0)}
+    profiles = {char: terminal.get(char, (0, 0)) for char in alphabet}
+
+    levels = []
+    previous_length = 0
+    for level in range(iterations + 1):
+        if level > 0:
+            counts = counts.dot(growth)
+            profiles = {
+                char: _bracket_profile(rules[char], profiles.get) if char in rules else profiles[char]
+                for char in alphabet
+            }
+
+        per_symbol = {char: int(counts[index[char]]) for char in alphabet}
+        length = sum(per_symbol.values())
+        segments = per_symbol.get("F", 0) + per_symbol.get("G", 0)
+        moves = segments + per_symbol.get("f", 0) + per_symbol.get("g", 0)
+        points = 1 + segments + per_symbol.get("]", 0)
+
+        brackets = per_symbol.get("[", 0) + per_symbol.get("]", 0)
+        turns = per_symbol.get("+", 0) + per_symbol.get("-", 0)
+
+        string_bytes = length * char_bytes
+        points_bytes = points * 16
+        # generate_l_system держит коды предыдущей строки с длинами и началами
+        # их замен (int64), индексы текущего куска, коды результата (по кускам
+        # и целиком) и в конце строку
+        code_bytes = 1 if widest < 256 else 4
+        chunk = min(previous_length, REWRITE_CHUNK) * length // max(previous_length, 1)
+        expand_bytes = (previous_length * (code_bytes + 16) + chunk * 16
+                        + length * 2 * code_bytes + string_bytes)
+        # Пик interpret_instructions вместе с normalize_points (замерено tracemalloc):
+        # маски по байту на символ, индексы и смещения событий, массивы точек
+        interpret_bytes = length * 3 + moves * 100 + brackets * 150 + turns * 16
+        # walk_turtle копит список кортежей, затем переводит его в массив
+        lazy_bytes = points * 185
+
+        levels.append({
+            "iteration": level,
+            "counts": per_symbol,
+            "length": length,
+            "segments": segments,
+            "points": points,
+            "max_depth": _bracket_profile(axiom, profiles.get)[1],
+            "string_bytes": string_bytes,
+            "points_bytes": points_bytes,
+            "total_bytes": max(expand_bytes, string_bytes + interpret_bytes),
+            "lazy_bytes": lazy_bytes,
+        })
+        previous_length = length
+
+    plan = dict(levels[-1])
+    plan["levels"] = levels
+    return plan
+
+
+def fit_iterations(plan, memory_budget, lazy=False):
+    """Наибольшее число итераций из плана, укладывающееся в бюджет памяти (или None)."""
+    key = "lazy_bytes" if lazy else "total_bytes"
+    fitting = [level["iteration"] for level in plan["levels"] if level[key] <= memory_budget]
+    return fitting[-1] if fitting else None
+
+
+def cached_points_l_system(disk_cache, l_system, iterations=4, randomness=0.0, step_length=1.0,
+                           seed=None):
+    """
+    Нормализованные точки и маска возвратов через DiskCache. При промахе
+    L-система раскрывается и интерпретируется, результат сохраняется,
+    а возвращаются массивы, отображённые из файлов кэша.
+    Кэшируются только воспроизводимые раскрытия: randomness=0 или целое зерно.
+    """
+    if randomness > 0 and not isinstance(seed, int):
+        points, breaks = points_l_system(l_system, iterations, randomness, step_length,
+                                         return_breaks=True, seed=seed)
+        return normalize_points(points), breaks
+
+    key = disk_cache.key(l_system, iterations, randomness, seed if randomness > 0 else None,
+                         step_length)
+    entry = disk_cache.load(key)
+    if entry is None:
+        instructions = generate_l_system(l_system["atom"], l_system["rules"], iterations,
+                                         randomness, seed)
+        points, breaks = interpret_instructions(instructions, l_system["angle"],
+                                                l_system["start_direction"], step_length)
+        points = normalize_points(points)
+        entry = disk_cache.store(key, instructions, points, breaks)
+        if entry is None:
+            return points, breaks
+
+    return entry["points"], entry["breaks"]
+
+
+def draw_l_system_from_file(filename, iterations=4, randomness=0.0, step_length=1.0, lazy=False,
+                            memory_budget=None, auto_reduce=True, disk_cache=None, seed=None,
+                            resolution=None, stats_hook=None):
+    """
+    memory_budget — ограничение памяти в байтах. Если по plan_l_system
+    результат в него не укладывается, число итераций уменьшается
+    (auto_reduce=True) или рисование отменяется.
+    disk_cache — DiskCache: повторные отрисовки берут точки из кэша
+    без раскрытия и интерпретации.
+    seed — зерно случайных решений при randomness > 0.
+    resolution — разрешение вывода в пикселях: точки перед рисованием
+    прореживаются simplify_path без видимой разницы.
+    stats_hook — обработчик статистики отрисовки (см. render_stats).
+
+    Возвращает статистику отрисовки: длительности стадий, длину строки
+    инструкций, число отрезков, глубину стека ветвлений и объём памяти
+    под основные массивы.
+    """
+    stats = RenderStats("l_system", file=filename, iterations=iterations)
+    plan = None
+
+    with stats.stage("parse"):
+        l_system = read_l_system_from_file(filename)
     if l_system is None:
         print(f"Не удалось загрузить L-систему из файла {filename}")
         return
 
+    if memory_budget is not None:
+        with stats.stage("plan"):
+            plan = plan_l_system(l_system, iterations)
+        required = plan["lazy_bytes" if lazy else "total_bytes"]
+        if required > memory_budget:
+            allowed = fit_iterations(plan, memory_budget, lazy) if auto_reduce else None
+            if allowed is None:
+                print(f"Для {iterations} итераций нужно около {required} байт "
+                      f"при бюджете {memory_budget} байт, рисование отменено")
+                return
+            print(f"Для {iterations} итераций нужно около {required} байт "
+                  f"при бюджете {memory_budget} байт, число итераций уменьшено до {allowed}")
+            iterations = allowed
+            stats.data["iterations"] = allowed
+
     print(f"L-система из файла {filename}:")
     print(f"Атом: {l_system['atom']}")
     print(f"Угол: {l_system['angle']}")
@@ -144,28 +848,300 @@ def draw_l_system_from_file(filename, iterations=4, randomness=0.0, step_length=
     for key, value in l_system["rules"].items():
         print(f"  {key} → {value}")
 
-    points = points_l_system(l_system, iterations, randomness, step_length)
+    if disk_cache is not None:
+        with stats.stage("cache"):
+            points, breaks = cached_points_l_system(disk_cache, l_system, iterations, randomness,
+                                                    step_length, seed)
+        stats.data["segments"] = int(np.count_nonzero(~breaks[1:]))
+    elif lazy:
+        # Раскрытие и интерпретация идут одним потоком
+        with stats.stage("interpret"):
+            symbols = iter_l_system(l_system["atom"], l_system["rules"], iterations, randomness, seed)
+            points, breaks = walk_turtle(symbols, l_system["angle"], l_system["start_direction"],
+                                         step_length)
+        stats.data["segments"] = int(np.count_nonzero(~breaks[1:]))
+    else:
+        with stats.stage("expand"):
+            instructions = generate_l_system(l_system["atom"], l_system["rules"], iterations,
+                                             randomness, seed)
+        with stats.stage("interpret"):
+            points, breaks = interpret_instructions(instructions, l_system["angle"],
+                                                    l_system["start_direction"], step_length,
+                                                    stats.data)
+        stats.data["instruction_length"] = len(instructions)
+        stats.add_allocation(instructions)
+        del instructions
+
+    if (disk_cache is not None or lazy) and randomness == 0:
+        # Строки инструкций на этих путях нет: длина и глубина стека берутся
+        # из плана, точного для детерминированного раскрытия (при randomness > 0
+        # эти поля остаются None)
+        if plan is None:
+            with stats.stage("plan"):
+                plan = plan_l_system(l_system, iterations)
+        level = plan["levels"][iterations]
+        stats.data["instruction_length"] = level["length"]
+        stats.data["max_depth"] = level["max_depth"]
 
-    points = normalize_points(points)
+    with stats.stage("normalize"):
+        if disk_cache is None:
+            points = normalize_points(points)
+        if resolution is not None:
+            points, breaks = simplify_path(points, resolution=resolution)
+    stats.add_allocation(points, breaks)
 
-    plt.figure(figsize=(10, 10))
-    plt.plot(points[:, 0], points[:, 1], color="darkgreen", linewidth=1)
-    plt.title(f"Фрактал: {os.path.basename(filename)} (итераций: {iterations})")
-    plt.axis("equal")
-    plt.axis("off")
-    plt.tight_layout()
+    with stats.stage("render"):
+        plt.figure(figsize=(10, 10))
+        plt.plot(points[:, 0], points[:, 1], color="darkgreen", linewidth=1)
+        plt.title(f"Фрактал: {os.path.basename(filename)} (итераций: {iterations})")
+        plt.axis("equal")
+        plt.axis("off")
+        plt.tight_layout()
+
+    stats.emit(stats_hook)
     plt.show()
+    return stats.data
 
-if __name__ == "__main__":
-    draw_l_system_from_file("Кривая Коха.txt", iterations=5, randomness=0)
-    draw_l_system_from_file("Квадратный остров Коха.txt", iterations=5, randomness=0)
-    draw_l_system_from_file("Ковёр Серпинского.txt", iterations=5, randomness=0)
-    #draw_l_system_from_file("Кривая Гильберта.txt", iterations=5, randomness=0)
-    draw_l_system_from_file("Кривая дракона Хартера-Хейтуэя.txt", iterations=15, randomness=0)
-    draw_l_system_from_file("Наконечник Серпинского.txt", iterations=7, randomness=0)
-    #draw_l_system_from_file("Шестиугольная кривая Госпера.txt", iterations=5, randomness=0)
-    #draw_l_system_from_file("Куст 1.txt", iterations=2, randomness=0)
-    #draw_l_system_from_file("Куст 2.txt", iterations=5, randomness=0)
-    #draw_l_system_from_file("Куст 3.txt", iterations=5, randomness=0)
 
+def iter_points_l_system(l_system, iterations=4, randomness=0.0, step_length=1.0, chunk_size=65536,
+                         seed=None):
+    """Точки L-системы частями по мере раскрытия (лениво, см. iter_turtle_chunks)."""
+    symbols = iter_l_system(l_system["atom"], l_system["rules"], iterations, randomness, seed)
+    return iter_turtle_chunks(symbols, l_system["angle"], l_system["start_direction"],
+                              step_length, chunk_size)
+
+
+def stream_bbox(l_system, iterations=4, randomness=0.0, step_length=1.0, chunk_size=65536,
+                seed=None):
+    """
+    Охватывающий прямоугольник для потоковой отрисовки: из GeometryCache,
+    а если это невозможно — предварительным проходом по точкам частями.
+    Чтобы проход совпал с последующим, seed должен быть SeedSequence.
+    """
+    if randomness == 0:
+        try:
+            return GeometryCache(l_system, step_length).summary(iterations)["bbox"]
+        except ValueError:
+            pass
+
+    bbox = None
+    for points, _ in iter_points_l_system(l_system, iterations, randomness, step_length,
+                                          chunk_size, seed):
+        bbox = _merge_bbox(bbox, (*points.min(axis=0), *points.max(axis=0)))
+    return bbox
+
+
+def render_l_system_png(filename, output, iterations=4, randomness=0.0, step_length=1.0,
+                        size=1024, antialias=True, chunk_size=None, seed=None):
+    """
+    Отрисовка L-системы из файла сразу в PNG, без matplotlib и дисплея.
+
+    chunk_size — потоковый режим: отрезки рисуются частями по мере работы
+    интерпретатора. Охватывающий прямоугольник для масштаба берётся из
+    GeometryCache, а если это невозможно — из предварительного прохода
+    с тем же зерном случайных решений.
+    """
+    l_system = read_l_system_from_file(filename)
+    if l_system is None:
+        print(f"Не удалось загрузить L-систему из файла {filename}")
+        return None
+
+    if chunk_size is None:
+        points, breaks = points_l_system(l_system, iterations, randomness, step_length,
+                                         return_breaks=True, seed=seed)
+        bbox = (*points.min(axis=0), *points.max(axis=0))
+        rasterizer = Rasterizer(size, size, bbox, antialias=antialias)
+        rasterizer.draw(points, breaks)
+        rasterizer.save(output)
+        return output
+
+    # Оба прохода должны принять одни и те же случайные решения
+    seed = seed_sequence(seed)
+    bbox = stream_bbox(l_system, iterations, randomness, step_length, chunk_size, seed)
+
+    rasterizer = Rasterizer(size, size, bbox, antialias=antialias)
+    for points, breaks in iter_points_l_system(l_system, iterations, randomness, step_length,
+                                               chunk_size, seed):
+        rasterizer.draw(points, breaks)
+    rasterizer.save(output)
+    return output
+
+
+def export_l_system(filename, output, iterations=4, randomness=0.0, step_length=1.0, size=1024,
+                    chunk_size=65536, seed=None, format=None, line_width=1.0):
+    """
+    Потоковый экспорт L-системы из файла в SVG или EPS (format, по умолчанию —
+    по расширению output). Масштаб берётся из stream_bbox, затем точки
+    частями по chunk_size переводятся в команды пути и сразу пишутся в файл,
+    так что память не зависит от числа отрезков.
+    """
+    l_system = read_l_system_from_file(filename)
+    if l_system is None:
+        print(f"Не удалось загрузить L-систему из файла {filename}")
+        return None
+
+    # Оба прохода должны принять одни и те же случайные решения
+    seed = seed_sequence(seed)
+    bbox = stream_bbox(l_system, iterations, randomness, step_length, chunk_size, seed)
+
+    with open(output, "w", encoding="ascii") as file:
+        writer = vector_writer(output, file, size, size, bbox, format=format)
+        writer.begin_path((0, 100, 0), line_width)
+        for points, breaks in iter_points_l_system(l_system, iterations, randomness, step_length,
+                                                   chunk_size, seed):
+            writer.draw(points, breaks)
+        writer.end_path()
+        writer.close()
+    return output
+
+
+def render_viewport_png(filename, output, iterations, viewport, size=1024, step_length=1.0,
+                        antialias=True):
+    """
+    Отрисовка в PNG увеличенного фрагмента детерминированной L-системы.
+
+    viewport — (xmin, ymin, xmax, ymax) в нормализованных координатах
+    фигуры целиком (как после normalize_points). Раскрываются только
+    подраскрытия, попадающие в кадр, с детализацией до пикселя
+    (см. GeometryCache.viewport_points).
+    """
+    l_system = read_l_system_from_file(filename)
+    if l_system is None:
+        print(f"Не удалось загрузить L-систему из файла {filename}")
+        return None
+
+    cache = GeometryCache(l_system, step_length)
+    bbox = cache.summary(iterations)["bbox"]
+    span = max(bbox[2] - bbox[0], bbox[3] - bbox[1])
+    view = (bbox[0] + viewport[0] * span, bbox[1] + viewport[1] * span,
+            bbox[0] + viewport[2] * span, bbox[1] + viewport[3] * span)
+    pixel_size = max(view[2] - view[0], view[3] - view[1]) / size
+
+    points, breaks = cache.viewport_points(iterations, view, pixel_size)
+    rasterizer = Rasterizer(size, size, view, margin=0, antialias=antialias)
+    rasterizer.draw(points, breaks)
+    rasterizer.save(output)
+    return output
+
+
+def _render_job(job):
+    """
+    Отрисовка одного файла в PNG для пакетного режима (выполняется в отдельном процессе).
+    Возвращает отчёт: время, длина строки, число отрезков и пик памяти.
+    """
+    report = {"file": job["filename"], "iterations": job["iterations"], "output": job["output"]}
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        l_system = read_l_system_from_file(job["filename"])
+        if l_system is None:
+            raise ValueError("не удалось разобрать файл")
+
+        instructions = generate_l_system(l_system["atom"], l_system["rules"],
+                                         job["iterations"], job["randomness"], job["seed"])
+        points, breaks = interpret_instructions(instructions, l_system["angle"],
+                                                l_system["start_direction"])
+        report["length"] = len(instructions)
+        report["segments"] = int(np.count_nonzero(~breaks[1:]))
+        del instructions
+
+        bbox = (*points.min(axis=0), *points.max(axis=0))
+        rasterizer = Rasterizer(job["size"], job["size"], bbox)
+        rasterizer.draw(points, breaks)
+        rasterizer.save(job["output"])
+    except Exception as e:
+        report["error"] = str(e)
+    finally:
+        report["time"] = time.perf_counter() - start
+        report["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return report
+
+
+def find_definition_files(sources):
+    """Файлы определений по списку каталогов и шаблонов (glob)."""
+    files = []
+    for source in sources:
+        if os.path.isdir(source):
+            files.extend(sorted(glob.glob(os.path.join(source, "*.txt"))))
+        else:
+            files.extend(sorted(glob.glob(source)))
+    return list(dict.fromkeys(files))
+
+
+def render_batch(sources, output_dir, iterations=4, overrides=None, randomness=0.0,
+                 size=1024, jobs=None, seed=None):
+    """
+    Пакетная отрисовка файлов определений в PNG в пуле процессов.
+    overrides — число итераций для отдельных файлов по имени файла.
+    """
+    overrides = overrides or {}
+    os.makedirs(output_dir, exist_ok=True)
+
+    tasks = []
+    for filename in find_definition_files(sources):
+        name = os.path.basename(filename)
+        file_iterations = overrides.get(name, iterations)
+        output = os.path.join(output_dir, f"{os.path.splitext(name)[0]}_{file_iterations}.png")
+        tasks.append({"filename": filename, "iterations": file_iterations, "output": output,
+                      "randomness": randomness, "seed": seed, "size": size})
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        reports = list(executor.map(_render_job, tasks))
+
+    print(f"{'Файл':<42} {'итер.':>5} {'время, с':>9} {'символов':>10} {'отрезков':>9} {'память, МБ':>10}")
+    for report in reports:
+        name = os.path.basename(report["file"])
+        if "error" in report:
+            print(f"{name:<42} {report['iterations']:>5} ошибка: {report['error']}")
+            continue
+        print(f"{name:<42} {report['iterations']:>5} {report['time']:>9.3f} {report['length']:>10} "
+              f"{report['segments']:>9} {report['peak_memory'] / 2 ** 20:>10.1f}")
+    return reports
+
+
+def parse_override(value):
+    """
+    Разбор переопределения вида "ИМЯ_ФАЙЛА=ИТЕРАЦИИ" в пару (имя, итерации);
+    используется как type= аргумента --set, так что ошибки сообщает argparse.
+    """
+    name, _, count = value.rpartition("=")
+    if not name:
+        raise argparse.ArgumentTypeError(f"Ожидалось ИМЯ=ИТЕРАЦИИ, получено {value!r}")
+    try:
+        count = int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Число итераций должно быть целым, получено {value!r}")
+    if count < 0:
+        raise argparse.ArgumentTypeError(f"Число итераций не может быть отрицательным: {value!r}")
+    return os.path.basename(name), count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Отрисовка L-систем из файлов определений")
+    parser.add_argument("--batch", nargs="+", metavar="ПУТЬ",
+                        help="каталоги или шаблоны файлов для пакетной отрисовки в PNG")
+    parser.add_argument("--output-dir", default="renders", help="каталог для изображений")
+    parser.add_argument("--iterations", type=int, default=4, help="число итераций по умолчанию")
+    parser.add_argument("--set", nargs="*", default=[], type=parse_override, metavar="ИМЯ=ИТЕРАЦИИ",
+                        help="число итераций для отдельных файлов")
+    parser.add_argument("--randomness", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None, help="зерно случайных решений")
+    parser.add_argument("--size", type=int, default=1024, help="размер изображения в пикселях")
+    parser.add_argument("--jobs", type=int, default=None, help="число процессов")
+    args = parser.parse_args()
 
+    if args.batch:
+        render_batch(args.batch, args.output_dir, args.iterations, dict(args.set),
+                     args.randomness, args.size, args.jobs, args.seed)
+    else:
+        draw_l_system_from_file("Кривая Коха.txt", iterations=5, randomness=0)
+        draw_l_system_from_file("Квадратный остров Коха.txt", iterations=5, randomness=0)
+        draw_l_system_from_file("Ковёр Серпинского.txt", iterations=5, randomness=0)
+        #draw_l_system_from_file("Кривая Гильберта.txt", iterations=5, randomness=0)
+        draw_l_system_from_file("Кривая дракона Хартера-Хейтуэя.txt", iterations=15, randomness=0)
+        draw_l_system_from_file("Наконечник Серпинского.txt", iterations=7, randomness=0)
+        #draw_l_system_from_file("Шестиугольная кривая Госпера.txt", iterations=5, randomness=0)
+        #draw_l_system_from_file("Куст 1.txt", iterations=2, randomness=0)
+        #draw_l_system_from_file("Куст 2.txt", iterations=5, randomness=0)
+        #draw_l_system_from_file("Куст 3.txt", iterations=5, randomness=0)
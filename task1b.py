@@ -1,173 +1,275 @@
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 import numpy as np
-import random
+import math
 import os
+import shutil
+import tempfile
 
+from lsystem_core import read_l_system_from_file, generate_l_system, iter_l_system
+from random_streams import seed_sequence, jitter_stream
+from render_stats import RenderStats
+from task1a import plan_l_system
+from vector_export import vector_writer
+
+
+BROWN = (0.4, 0.2, 0.0)
+LIGHT_BROWN = (0.6, 0.4, 0.2)
+GREEN = (0.0, 0.6, 0.0)
+
+
+def depth_palette(max_depth, iterations, color_transition):
+    """
+    Цвета ветвей для глубин 0..max_depth: от коричневого к светло-коричневому
+    до color_transition, затем от светло-коричневого к зеленому.
+    """
+    progress = np.arange(max_depth + 1) / max(iterations, 1)
+    brown, light_brown, green = np.array(BROWN), np.array(LIGHT_BROWN), np.array(GREEN)
+
+    palette = np.empty((max_depth + 1, 3))
+    trunk = progress < color_transition
+    t = progress[trunk, None] / color_transition
+    palette[trunk] = brown + t * (light_brown - brown)
+    if color_transition < 1:
+        t = (progress[~trunk, None] - color_transition) / (1 - color_transition)
+        palette[~trunk] = light_brown + t * (green - light_brown)
+    else:
+        palette[~trunk] = green
+
+    return np.clip(palette, 0.0, 1.0)
 
-def read_l_system_from_file(filename):
-    """
-    Чтение L-системы из текстового файла
-    Формат файла:
-    <атом> <угол поворота> <начальное направление>
-    <правило №1>
-    <правило №2>
-    ...
-    """
-    l_system = {
-        "atom": "",
-        "rules": {},
-        "angle": 0,
-        "start_direction": 0
-    }
-
-    try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            lines = [line.strip() for line in file.readlines() if line.strip()]
-
-        if len(lines) < 2:
-            raise ValueError("Файл должен содержать как минимум 2 строки")
-
-        first_line = lines[0].split()
-        l_system["atom"] = first_line[0]
-        l_system["angle"] = float(first_line[1])
-        l_system["start_direction"] = float(first_line[2]) if len(first_line) > 2 else 0
-
-        for line in lines[1:]:
-            if '→' in line:
-                key, value = line.split('→', 1)
-            elif '=' in line:
-                key, value = line.split('=', 1)
-            else:
-                parts = line.split(':', 1)
-                if len(parts) == 2:
-                    key, value = parts
-                else:
-                    continue
 
-            l_system["rules"][key.strip()] = value.strip()
+def iter_tree_segments(instructions, base_angle, direction=0.0, step_length=10.0,
+                       angle_randomness=15.0, seed=None, chunk_size=65536):
+    """
+    Проход черепахи по инструкциям дерева частями: выдаёт пары (отрезки
+    формы (k, 2, 2), глубины ветвления), не больше chunk_size отрезков в части.
+    Случайные отклонения углов берутся блоками из подпотока зерна seed.
+    """
+    jitter = jitter_stream(seed_sequence(seed), angle_randomness)
+    x, y = 0.0, 0.0
+    stack = []
+    current_angle = np.radians(direction)
+    turn = np.radians(base_angle)
+    current_depth = 0
+
+    segments = []
+    depths = []
+
+    for char in instructions:
+        if char == "F":
+            # Двигаемся вперед с рисованием
+            x_new = x + math.sin(current_angle) * step_length
+            y_new = y + math.cos(current_angle) * step_length
+            segments.append(((x, y), (x_new, y_new)))
+            depths.append(current_depth)
+            x, y = x_new, y_new
+            if len(segments) == chunk_size:
+                yield np.array(segments, dtype=float), np.array(depths, dtype=np.int64)
+                segments, depths = [], []
 
-    except Exception as e:
-        print(f"Ошибка при чтении файла {filename}: {e}")
-        return None
+        elif char == "f":
+            x += math.sin(current_angle) * step_length
+            y += math.cos(current_angle) * step_length
 
-    return l_system
+        elif char == "+":
+            random_offset = math.radians(next(jitter))
+            current_angle -= turn + random_offset
 
+        elif char == "-":
+            random_offset = math.radians(next(jitter))
+            current_angle += turn + random_offset
 
-def generate_l_system(axiom, rules, iterations, randomness=0.0):
-    current_string = axiom
+        elif char == "[":
+            stack.append((x, y, current_angle, current_depth))
+            current_depth += 1
 
-    for _ in range(iterations):
-        result = []
-        for char in current_string:
-            if char in rules:
-                # Добавление случайности
-                if randomness > 0 and random.random() < randomness:
-                    result.append(char)
-                else:
-                    result.append(rules[char])
-            else:
-                result.append(char)
-        current_string = "".join(result)
+        elif char == "]":
+            if stack:
+                x, y, current_angle, current_depth = stack.pop()
 
-    return current_string
+    if segments:
+        yield np.array(segments, dtype=float), np.array(depths, dtype=np.int64)
 
 
-def clamp_color(value):
-    return max(0.0, min(1.0, value))
+def tree_segments(instructions, base_angle, direction=0.0, step_length=10.0, angle_randomness=15.0,
+                  seed=None):
+    """
+    Проход черепахи по инструкциям дерева.
+    Возвращает массив отрезков формы (N, 2, 2) и глубину ветвления каждого отрезка.
+    """
+    chunks = list(iter_tree_segments(instructions, base_angle, direction, step_length,
+                                     angle_randomness, seed))
+    if not chunks:
+        return np.empty((0, 2, 2)), np.empty(0, dtype=np.int64)
+    segments, depths = zip(*chunks)
+    return np.concatenate(segments), np.concatenate(depths)
 
 
 def draw_fractal_tree(l_system, iterations=4, step_length=10.0,
                       initial_thickness=5.0, thickness_decay=0.7,
-                      color_transition=0.7, angle_randomness=15.0):
+                      color_transition=0.7, angle_randomness=15.0, lazy=False, seed=None,
+                      stats_hook=None):
     """
     Parameters:
     - initial_thickness: начальная толщина ствола
     - thickness_decay: коэффициент уменьшения толщины для каждой ветви
     - color_transition: точка перехода от коричневого к зеленому (0-1)
     - angle_randomness: случайное отклонение угла в градусах
+    - lazy: раскрывать L-систему генератором iter_l_system, не храня всю строку
+    - seed: зерно (int, SeedSequence или numpy Generator) для отклонений углов
+    - stats_hook: обработчик статистики отрисовки (см. render_stats)
+
+    Отрезки и их глубины собираются в массивы и выводятся plot_tree.
     """
 
     axiom = l_system["atom"]
     base_angle = l_system["angle"]
     direction = l_system["start_direction"]
     rules = l_system["rules"]
+    stats = RenderStats("tree", iterations=iterations)
 
-    instructions = generate_l_system(axiom, rules, iterations, 0.0)
+    if lazy:
+        # Раскрытие идёт вместе с интерпретацией
+        instructions = iter_l_system(axiom, rules, iterations, 0.0)
+    else:
+        with stats.stage("expand"):
+            instructions = generate_l_system(axiom, rules, iterations, 0.0)
+        stats.data["instruction_length"] = len(instructions)
+        stats.add_allocation(instructions)
+
+    with stats.stage("interpret"):
+        segments, depths = tree_segments(instructions, base_angle, direction,
+                                         step_length, angle_randomness, seed)
+
+    stats.data["segments"] = len(segments)
+    # Глубина стека ветвлений, а не только рисующих отрезков: самые
+    # вложенные ветви могут не содержать F. Раскрытие детерминированное,
+    # так что план точен (и даёт длину строки при ленивом раскрытии)
+    with stats.stage("plan"):
+        plan = plan_l_system(l_system, iterations)
+    stats.data["max_depth"] = plan["max_depth"]
+    if lazy:
+        stats.data["instruction_length"] = plan["length"]
+    stats.add_allocation(segments, depths)
+
+    with stats.stage("render"):
+        fig, ax = plot_tree(segments, depths, iterations, initial_thickness, thickness_decay,
+                            color_transition)
+
+    stats.emit(stats_hook)
+    return fig, ax
 
-    fig, ax = plt.subplots(figsize=(10, 12))
 
-    x, y = 0, 0
-    stack = []
-    current_angle = np.radians(direction)
-    current_thickness = initial_thickness
-    current_depth = 0
-    max_depth = iterations
+def plot_tree(segments, depths, iterations, initial_thickness=5.0, thickness_decay=0.7,
+              color_transition=0.7):
+    """
+    Рисунок matplotlib из готовых отрезков и их глубин (см. tree_segments):
+    отрезки, их цвета и толщины выводятся одной коллекцией LineCollection.
+    """
+    max_depth = int(depths.max()) if len(depths) else 0
+    palette = depth_palette(max_depth, iterations, color_transition)
+    thicknesses = initial_thickness * thickness_decay ** np.arange(max_depth + 1)
 
-    for char in instructions:
-        if char == "F":
-            # Двигаемся вперед с рисованием
-            x_new = x + np.sin(current_angle) * step_length
-            y_new = y + np.cos(current_angle) * step_length
-
-            # Определяем цвет в зависимости от глубины
-            progress = current_depth / max_depth
-            if progress < color_transition:
-                # Интерполяция от коричневого к светло-коричневому
-                brown_color = (0.4, 0.2, 0.0)
-                light_brown = (0.6, 0.4, 0.2)
-                t = progress / color_transition
-                color = (
-                    clamp_color(brown_color[0] + t * (light_brown[0] - brown_color[0])),
-                    clamp_color(brown_color[1] + t * (light_brown[1] - brown_color[1])),
-                    clamp_color(brown_color[2] + t * (light_brown[2] - brown_color[2]))
-                )
-            else:
-                # Интерполяция от светло-коричневого к зеленому
-                light_brown = (0.6, 0.4, 0.2)
-                green = (0.0, 0.6, 0.0)
-                t = (progress - color_transition) / (1 - color_transition)
-                color = (
-                    clamp_color(light_brown[0] + t * (green[0] - light_brown[0])),
-                    clamp_color(light_brown[1] + t * (green[1] - light_brown[1])),
-                    clamp_color(light_brown[2] + t * (green[2] - light_brown[2]))
-                )
-
-            ax.plot([x, x_new], [y, y_new],
-                    color=color,
-                    linewidth=current_thickness,
-                    solid_capstyle='round')
+    fig, ax = plt.subplots(figsize=(10, 12))
 
-            x, y = x_new, y_new
+    branches = LineCollection(segments, colors=palette[depths], linewidths=thicknesses[depths],
+                              capstyle='round')
+    ax.add_collection(branches)
+    ax.autoscale_view()
 
-        elif char == "f":
-            x_new = x + np.sin(current_angle) * step_length
-            y_new = y + np.cos(current_angle) * step_length
-            x, y = x_new, y_new
+    ax.set_aspect('equal')
+    ax.axis('off')
+    plt.tight_layout()
+    return fig, ax
 
-        elif char == "+":
-            random_offset = np.radians(random.uniform(-angle_randomness, angle_randomness))
-            current_angle -= np.radians(base_angle) + random_offset
 
-        elif char == "-":
-            random_offset = np.radians(random.uniform(-angle_randomness, angle_randomness))
-            current_angle += np.radians(base_angle) + random_offset
+def segment_path(segments):
+    """
+    Точки и маска переходов (как у walk_turtle) для ломаной через отрезки
+    (k, 2, 2). Начало отрезка пропускается, если ломаная продолжается
+    из конца предыдущего.
+    """
+    points = segments.reshape(-1, 2)
+    breaks = np.tile((True, False), len(segments))
+    keep = np.ones(len(points), dtype=bool)
+    keep[2::2] = (segments[1:, 0] != segments[:-1, 1]).any(axis=1)
+    return points[keep], breaks[keep]
 
-        elif char == "[":
-            stack.append((x, y, current_angle, current_thickness, current_depth))
-            current_thickness *= thickness_decay
-            current_depth += 1
 
-        elif char == "]":
-            if stack:
-                x, y, current_angle, current_thickness, current_depth = stack.pop()
+def vector_style(max_depth, iterations, size, initial_thickness=5.0, thickness_decay=0.7,
+                 color_transition=0.7):
+    """
+    Цвета (0-255) и толщины ветвей глубин 0..max_depth для векторного
+    рисунка шириной size точек, в тех же пропорциях, что у draw_fractal_tree.
+    """
+    palette = np.rint(depth_palette(max_depth, iterations, color_transition) * 255).astype(int)
+    # Толщины draw_fractal_tree заданы в точках для рисунка шириной около 720 точек
+    thicknesses = initial_thickness * thickness_decay ** np.arange(max_depth + 1) * size / 720
+    return palette, thicknesses
 
-        elif char == "@":
-            pass
 
-    ax.set_aspect('equal')
-    ax.axis('off')
-    plt.tight_layout()
-    return fig, ax
+def export_fractal_tree(l_system, output, iterations=4, step_length=10.0,
+                        initial_thickness=5.0, thickness_decay=0.7,
+                        color_transition=0.7, angle_randomness=15.0, seed=None,
+                        size=1024, chunk_size=65536, format=None):
+    """
+    Потоковый экспорт дерева в SVG или EPS (format, по умолчанию — по
+    расширению output). Параметры — как у draw_fractal_tree.
+
+    L-система раскрывается лениво (iter_l_system), отрезки идут частями
+    по chunk_size. Первый проход находит охватывающий прямоугольник
+    и наибольшую глубину, второй пишет команды пути каждой глубины
+    во временный файл. Затем глубины выводятся по порядку, каждая одним
+    путём со своим цветом и толщиной, так что память не зависит от числа
+    отрезков.
+    """
+    axiom = l_system["atom"]
+    base_angle = l_system["angle"]
+    direction = l_system["start_direction"]
+    rules = l_system["rules"]
+
+    # Оба прохода должны получить одни и те же отклонения углов
+    seed = seed_sequence(seed)
+
+    def chunks():
+        return iter_tree_segments(iter_l_system(axiom, rules, iterations, 0.0), base_angle,
+                                  direction, step_length, angle_randomness, seed, chunk_size)
+
+    bbox, max_depth = None, 0
+    for segments, depths in chunks():
+        points = segments.reshape(-1, 2)
+        low, high = points.min(axis=0), points.max(axis=0)
+        if bbox is not None:
+            low, high = np.minimum(low, bbox[:2]), np.maximum(high, bbox[2:])
+        bbox = (*low, *high)
+        max_depth = max(max_depth, int(depths.max()))
+    if bbox is None:
+        bbox = (0.0, 0.0, 0.0, 0.0)
+
+    palette, thicknesses = vector_style(max_depth, iterations, size, initial_thickness,
+                                        thickness_decay, color_transition)
+
+    with open(output, "w", encoding="ascii") as file:
+        writer = vector_writer(output, file, size, size, bbox, format=format)
+        paths = [tempfile.TemporaryFile("w+", encoding="ascii") for _ in range(max_depth + 1)]
+        try:
+            for segments, depths in chunks():
+                for depth in np.unique(depths):
+                    paths[depth].write(writer.fragment_data(*segment_path(segments[depths == depth])))
+
+            for depth, path in enumerate(paths):
+                if path.tell() == 0:
+                    continue
+                path.seek(0)
+                writer.begin_path(tuple(palette[depth].tolist()), float(thicknesses[depth]))
+                shutil.copyfileobj(path, file)
+                writer.end_path()
+        finally:
+            for path in paths:
+                path.close()
+        writer.close()
+    return output
 
 
 def create_fractal_tree_file():
@@ -1,5 +1,99 @@
+import queue
+import threading
 import tkinter as tk
-import random
+from collections import deque
+
+import numpy as np
+
+from heightmap import diamond_square, heightmap_preview
+from random_streams import seed_sequence
+
+# Задержка перерисовки после последнего события изменения размера (мс)
+RESIZE_DELAY = 100
+
+# Период опроса очереди уровней, пока фоновый поток их считает (мс)
+POLL_INTERVAL = 20
+
+# Наибольшее число итераций для карты высот: 4097² float32 — 64 МБ в памяти
+# (ползунок итераций рассчитан на одномерный профиль и доходит до 20)
+HEIGHTMAP_MAX_ITERATIONS = 12
+
+
+def midpoint_displacement_step(heights, roughness, rng):
+    """
+    Один шаг алгоритма для пакета профилей heights формы (batch, n):
+    между соседними точками вставляются середины, смещённые случайно
+    в пределах [-roughness, roughness]. Возвращает массив (batch, 2n - 1).
+    """
+    batch, count = heights.shape
+    new_heights = np.empty((batch, 2 * count - 1), dtype=heights.dtype)
+    new_heights[:, ::2] = heights
+    new_heights[:, 1::2] = (heights[:, :-1] + heights[:, 1:]) / 2
+    new_heights[:, 1::2] += rng.uniform(-roughness, roughness, (batch, count - 1))
+    return new_heights
+
+
+def iter_midpoint_displacement(iterations, roughness=1.0, batch=None, seed=None, start=0.0, end=0.0):
+    """
+    Генератор уровней профиля: после каждого шага выдаётся массив высот
+    (batch, 2 ** k + 1), точки равномерно распределены по x от 0 до 1.
+    Грубость на каждом шаге уменьшается вдвое.
+    batch=None — один профиль, высоты выдаются одномерным массивом.
+    seed — зерно (int, SeedSequence или numpy Generator).
+    """
+    rng = np.random.default_rng(seed_sequence(seed))
+    heights = np.empty((1 if batch is None else batch, 2))
+    heights[:, 0] = start
+    heights[:, 1] = end
+
+    for _ in range(iterations):
+        heights = midpoint_displacement_step(heights, roughness, rng)
+        roughness /= 2
+        yield heights[0] if batch is None else heights
+
+
+def midpoint_displacement(iterations, roughness=1.0, batch=None, seed=None, start=0.0, end=0.0):
+    """
+    Профиль (или пакет профилей для batch) после iterations шагов.
+    Все профили пакета независимы и строятся одними операциями над массивами.
+    """
+    heights = np.array([start, end], dtype=float)
+    if batch is not None:
+        heights = np.tile(heights, (batch, 1))
+    for heights in iter_midpoint_displacement(iterations, roughness, batch, seed, start, end):
+        pass
+    return heights
+
+
+def generation_worker(levels, cancel, iterations, roughness, seed=None):
+    """
+    Фоновый расчёт профиля: каждый готовый уровень кладётся в очередь levels,
+    в конце кладётся None. Расчёт прекращается, как только установлено
+    событие cancel.
+    """
+    for heights in iter_midpoint_displacement(iterations, roughness, seed=seed):
+        if cancel.is_set():
+            return
+        levels.put(heights)
+    levels.put(None)
+
+
+def heightmap_worker(results, cancel, iterations, roughness, size, seed=None):
+    """
+    Фоновый расчёт карты высот: в очередь results кладётся её уменьшенная
+    копия (см. heightmap_preview) размером около size, если расчёт не отменён.
+    """
+    heights = diamond_square(iterations, roughness, seed=seed)
+    if not cancel.is_set():
+        results.put(heightmap_preview(heights, size))
+
+
+def preview_image(preview):
+    """tk.PhotoImage из массива оттенков серого uint8 (через данные PGM)."""
+    height, width = preview.shape
+    data = f"P5 {width} {height} 255\n".encode("ascii") + preview.tobytes()
+    return tk.PhotoImage(data=data, format="PPM")
+
 
 class MountainVisualizer:
     def __init__(self, root):
@@ -25,7 +119,7 @@ class MountainVisualizer:
         self.roughness_slider.pack(side=tk.LEFT)
 
         tk.Label(control_frame, text="Iterations:").pack(side=tk.LEFT)
-        self.iterations_slider = tk.Scale(control_frame, from_=1, to=10,
+        self.iterations_slider = tk.Scale(control_frame, from_=1, to=20,
                                           orient=tk.HORIZONTAL, variable=self.iterations)
         self.iterations_slider.pack(side=tk.LEFT)
 
@@ -35,72 +129,160 @@ class MountainVisualizer:
         self.delay_slider.pack(side=tk.LEFT)
 
         tk.Button(control_frame, text="Generate", command=self.start_generation).pack(side=tk.LEFT)
+        tk.Button(control_frame, text="Heightmap", command=self.show_heightmap).pack(side=tk.LEFT)
 
         self.canvas.bind("<Configure>", self.on_resize)
 
-        self.points = []  # Хранение точек для рисования
+        self.heights = np.zeros(2)  # Высоты профиля (в долях половины высоты холста)
+        self.seed = None  # Зерно генерации (None — новый профиль при каждом запуске)
+        self._animation = None
+        self._job = None  # (очередь уровней, событие отмены) текущей генерации
+        self._pending = deque()  # Полученные, но ещё не показанные уровни
+        self._resize_job = None
+        self._generated = None  # Параметры (грубость, итерации) текущего профиля
+        self._preview = None  # Показанная карта высот (tk.PhotoImage) или None
 
     def on_resize(self, event):
-        self.generate_mountain()
-
-    def midpoint_displacement_step(self, points, roughness):
-        """Функция, выполняющая один шаг алгоритма и возвращающая новые точки."""
-        new_points = []
-        for i in range(len(points) - 1):
-            p1, p2 = points[i], points[i + 1]
-            mid_x = (p1[0] + p2[0]) / 2
-            mid_y = (p1[1] + p2[1]) / 2
+        """
+        События изменения размера объединяются: профиль перерисовывается
+        один раз, когда они перестают приходить в течение RESIZE_DELAY мс.
+        """
+        if self._resize_job is not None:
+            self.root.after_cancel(self._resize_job)
+        self._resize_job = self.root.after(RESIZE_DELAY, self.generate_mountain)
 
-            # Смещение точки по оси Y с учетом грубости
-            displacement = random.uniform(-1, 1) * roughness
-            mid_y += displacement
+    def profile_coords(self, heights, width, height):
+        """Координаты профиля на холсте одним плоским списком x0, y0, x1, y1, ..."""
+        # На пиксель ширины хватает пары точек: берётся каждая stride-я
+        # (stride — степень двойки, поэтому крайняя точка сохраняется)
+        ratio = (len(heights) - 1) // (2 * max(width, 1))
+        stride = 1 << max(0, ratio.bit_length() - 1)
+        heights = heights[::stride]
 
-            new_points.append(p1)
-            new_points.append((mid_x, mid_y))
-
-        new_points.append(points[-1])
-        return new_points
+        coords = np.empty((len(heights), 2))
+        coords[:, 0] = np.linspace(0, width, len(heights))
+        coords[:, 1] = height // 2 + heights * (height // 2)
+        return coords.ravel().tolist()
 
     def draw_mountain(self):
-        """Рисует горный массив на холсте."""
+        """Рисует горный массив на холсте одной ломаной."""
         self.canvas.delete("all")
-        if len(self.points) < 2:
+        if len(self.heights) < 2:
             return
 
-        for i in range(len(self.points) - 1):
-            self.canvas.create_line(self.points[i][0], self.points[i][1],
-                                    self.points[i + 1][0], self.points[i + 1][1],
-                                    fill="black", width=2)
+        coords = self.profile_coords(self.heights, self.canvas.winfo_width(), self.canvas.winfo_height())
+        self.canvas.create_line(*coords, fill="black", width=2)
+
+    def animate_step(self):
+        """
+        Забирает из очереди уровни, посчитанные фоновым потоком, показывает
+        следующий и планирует следующий шаг. Задержка между шагами влияет
+        только на показ: расчёт идёт, не дожидаясь его.
+        """
+        levels, _ = self._job
+        while True:
+            try:
+                self._pending.append(levels.get_nowait())
+            except queue.Empty:
+                break
+
+        if not self._pending:
+            # Следующий уровень ещё считается
+            self._animation = self.root.after(POLL_INTERVAL, self.animate_step)
+            return
 
-    def animate_step(self, depth, roughness):
-        """Анимирует шаги алгоритма и перерисовывает линии."""
-        if depth == 0:
+        heights = self._pending.popleft()
+        if heights is None:
+            self._animation = None
+            self._job = None
             return
 
-        # Выполняем шаг алгоритма Midpoint Displacement
-        self.points = self.midpoint_displacement_step(self.points, roughness)
+        self.heights = heights
         self.draw_mountain()
 
-        # Уменьшаем грубость для следующего шага и планируем следующий шаг через задержку
-        self.root.after(self.step_delay.get(), self.animate_step, depth - 1, roughness / 2)
+        self._animation = self.root.after(self.step_delay.get(), self.animate_step)
+
+    def stop_animation(self):
+        """Останавливает показ и отменяет расчёт в фоновом потоке."""
+        if self._animation is not None:
+            self.root.after_cancel(self._animation)
+            self._animation = None
+        if self._job is not None:
+            self._job[1].set()
+            self._job = None
+        self._pending.clear()
+
+    def show_heightmap(self):
+        """
+        Карта высот "ромб-квадрат" с текущими грубостью и числом итераций
+        (не больше HEIGHTMAP_MAX_ITERATIONS); она считается в фоновом потоке,
+        а на холсте показывается её уменьшенная копия.
+        """
+        self.stop_animation()
+        iterations = min(self.iterations.get(), HEIGHTMAP_MAX_ITERATIONS)
+        size = max(min(self.canvas.winfo_width(), self.canvas.winfo_height()), 1)
+
+        results = queue.Queue()
+        cancel = threading.Event()
+        threading.Thread(target=heightmap_worker, daemon=True,
+                         args=(results, cancel, iterations, self.roughness.get(), size,
+                               self.seed)).start()
+        self._job = (results, cancel)
+        self.poll_heightmap()
+
+    def poll_heightmap(self):
+        """Ждёт карту высот из фонового потока, не блокируя интерфейс."""
+        results, _ = self._job
+        try:
+            preview = results.get_nowait()
+        except queue.Empty:
+            self._animation = self.root.after(POLL_INTERVAL, self.poll_heightmap)
+            return
+
+        self._animation = None
+        self._job = None
+        self._preview = preview_image(preview)
+        self.draw_heightmap()
+
+    def draw_heightmap(self):
+        """Рисует карту высот по центру холста."""
+        self.canvas.delete("all")
+        self.canvas.create_image(self.canvas.winfo_width() // 2, self.canvas.winfo_height() // 2,
+                                 image=self._preview)
 
     def start_generation(self):
         """Инициализация точек и запуск анимации генерации."""
-        width = self.canvas.winfo_width()
-        height = self.canvas.winfo_height()
+        self.stop_animation()
+        self._preview = None
 
         # Начальные точки (по краям экрана)
-        self.points = [(0, height // 2), (width, height // 2)]
+        self.heights = np.zeros(2)
+        self._generated = (self.roughness.get(), self.iterations.get())
 
-        roughness = self.roughness.get() * (height // 2)
-        iterations = self.iterations.get()
+        # Уровни считаются в фоновом потоке и передаются через очередь
+        levels = queue.Queue()
+        cancel = threading.Event()
+        threading.Thread(target=generation_worker, daemon=True,
+                         args=(levels, cancel, self.iterations.get(), self.roughness.get(),
+                               self.seed)).start()
+        self._job = (levels, cancel)
 
         # Старт анимации
-        self.animate_step(iterations, roughness)
+        self.animate_step()
 
     def generate_mountain(self):
-        """Очищает холст и перерисовывает на resize."""
-        self.start_generation()
+        """
+        Перерисовка на resize: профиль хранится в относительных координатах
+        и только масштабируется под новый размер холста. Заново он строится,
+        лишь если с прошлой генерации изменились грубость или число итераций.
+        """
+        self._resize_job = None
+        if self._preview is not None:
+            self.draw_heightmap()
+        elif self._generated != (self.roughness.get(), self.iterations.get()):
+            self.start_generation()
+        else:
+            self.draw_mountain()
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -1,15 +1,52 @@
 import matplotlib.pyplot as plt
 from matplotlib.backend_bases import MouseButton
-from matplotlib.patches import Circle
 import numpy as np
 
+from point_index import GridIndex
+from spline import NaturalCubicSpline
+
+# Допустимое отклонение ломаной от кривой (пиксели) и наибольшее число её вершин
+TOLERANCE = 0.25
+MAX_VERTICES = 50000
+
+# Наименьший интервал между перерисовками при перетаскивании (мс), ~60 кадров/с
+FRAME_INTERVAL = 16
+
+# Радиус захвата опорной точки в координатах данных и размер маркера (pt²)
+PICK_RADIUS = 0.2
+MARKER_SIZE = 150
+
 class SplineEditor:
     def __init__(self):
         self.fig, self.ax = plt.subplots()
-        self.points = []
-        self.circles = []
-        self.curve = None
-        self.selected_circle = None
+
+        # Опорные точки — массив (n, 2) в порядке сплайна; у каждой есть
+        # постоянный идентификатор (ids возрастают, так как точки добавляются
+        # в конец), по которому она хранится в сеточном индексе
+        self.points = np.empty((0, 2))
+        self.ids = np.empty(0, dtype=np.int64)
+        self.next_id = 0
+        self.index = GridIndex(2 * PICK_RADIUS)
+        self.selected = None  # Идентификатор перетаскиваемой точки
+
+        # Все точки рисуются одной коллекцией
+        self.markers = self.ax.scatter([], [], s=MARKER_SIZE, color='red', zorder=3)
+
+        # Одна линия кривой на всё время работы, обновляется через set_data
+        self.curve, = self.ax.plot([], [], 'blue')
+        self.spline = None
+        self.sampled = None  # Коэффициенты, по которым посчитаны точки кривой
+        self.counts = None  # Число отрезков ломаной на каждом сегменте
+        self.starts = None  # Номер первой точки каждого сегмента в curve_points
+        self.curve_points = np.empty((0, 2))
+
+        # Перетаскивание: фон без перетаскиваемых объектов и последнее
+        # ещё не обработанное положение мыши
+        self.background = None
+        self.pending = None
+        self.frame_timer = self.fig.canvas.new_timer(interval=FRAME_INTERVAL)
+        self.frame_timer.single_shot = True
+        self.frame_timer.add_callback(self.apply_motion)
 
         self.ax.set_xlim(0, 10)
         self.ax.set_ylim(0, 10)
@@ -18,101 +55,164 @@ class SplineEditor:
         self.fig.canvas.mpl_connect('button_release_event', self.on_release)
         self.fig.canvas.mpl_connect('motion_notify_event', self.on_motion)
 
+    def add_points(self, points):
+        """Добавление точек в конец кривой (например, импорт) с одним пересчётом."""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        ids = np.arange(self.next_id, self.next_id + len(points))
+        self.next_id += len(points)
+        for point_id, (x, y) in zip(ids.tolist(), points.tolist()):
+            self.index.insert(point_id, x, y)
+
+        self.points = np.concatenate((self.points, points))
+        self.ids = np.concatenate((self.ids, ids))
+        self.markers.set_offsets(self.points)
+        self.update_curve()
+
     def add_point(self, x, y):
-        point = np.array([x, y])
-        self.points.append(point)
+        self.add_points([[x, y]])
+
+    def row(self, point_id):
+        """Номер точки в массиве по идентификатору."""
+        return int(np.searchsorted(self.ids, point_id))
+
+    def remove_point(self, point_id):
+        row = self.row(point_id)
+        self.index.remove(point_id)
+        self.points = np.delete(self.points, row, axis=0)
+        self.ids = np.delete(self.ids, row)
+        self.markers.set_offsets(self.points)
+        self.update_curve()
 
-        circle = Circle((x, y), 0.2, color='red', picker=True)
-        self.circles.append(circle)
-        self.ax.add_patch(circle)
+    def pick(self, event):
+        """Идентификатор точки под курсором или None."""
+        return self.index.nearest(event.xdata, event.ydata, PICK_RADIUS)
 
-        self.update_curve()
+    def pixel_scale(self):
+        """Пикселей на единицу данных по x и y."""
+        (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+        return self.ax.bbox.width / abs(x1 - x0), self.ax.bbox.height / abs(y1 - y0)
 
-    def remove_point(self, circle):
-        index = self.circles.index(circle)
-        self.points.pop(index)
-        circle.remove()
-        self.circles.pop(index)
-        self.update_curve()
+    def segment_counts(self):
+        return self.spline.segment_counts(TOLERANCE, self.pixel_scale(), MAX_VERTICES)[0]
 
     def calculate_cubic_spline(self):
-        points = np.array(self.points)
-        x, y = points[:, 0], points[:, 1]
-        n = len(x) - 1  # количество сегментов
-
-        # Коэффициенты для каждой кривой
-        h = np.diff(x)
-        alpha = np.zeros(n)
-        for i in range(1, n):
-            alpha[i] = (3 / h[i] * (y[i + 1] - y[i]) - 3 / h[i - 1] * (y[i] - y[i - 1]))
-
-        # Решаем систему линейных уравнений для нахождения c
-        l = np.ones(n + 1)
-        mu = np.zeros(n)
-        z = np.zeros(n + 1)
-        for i in range(1, n):
-            l[i] = 2 * (x[i + 1] - x[i - 1]) - h[i - 1] * mu[i - 1]
-            mu[i] = h[i] / l[i]
-            z[i] = (alpha[i] - h[i - 1] * z[i - 1]) / l[i]
-
-        # Вычисление коэффициентов c, b, и d для каждого сегмента
-        b = np.zeros(n)
-        c = np.zeros(n + 1)
-        d = np.zeros(n)
-        a = y[:-1]
-
-        for j in range(n - 1, -1, -1):
-            c[j] = z[j] - mu[j] * c[j + 1]
-            b[j] = (y[j + 1] - y[j]) / h[j] - h[j] * (c[j + 1] + 2 * c[j]) / 3
-            d[j] = (c[j + 1] - c[j]) / (3 * h[j])
-
-        # Создаем кривую
-        curve_points = []
-        for i in range(n):
-            xs = np.linspace(x[i], x[i + 1], 20)
-            for xi in xs:
-                yi = (a[i] + b[i] * (xi - x[i]) + c[i] * (xi - x[i]) ** 2 + d[i] * (xi - x[i]) ** 3)
-                curve_points.append([xi, yi])
-
-        return np.array(curve_points)
+        """
+        Точки кривой: на каждом сегменте столько, чтобы ломаная отходила
+        от кривой не больше чем на TOLERANCE пикселей (но не больше
+        MAX_VERTICES на всю кривую).
+        """
+        self.spline = NaturalCubicSpline(self.points[:, 0], self.points[:, 1])
+        self.sampled = self.spline.coefficients.copy()
+        self.counts = self.segment_counts()
+        self.starts = np.concatenate(([0], np.cumsum(self.counts)))
+        return np.concatenate((self.spline.sample_intervals(self.counts), self.spline.end_points()))
+
+    def update_segments(self):
+        """
+        Пересчёт кривой после сдвига одной точки. Коэффициенты сплайна
+        считаются заново, но точки кривой пересчитываются только на участке
+        от первого до последнего заметно изменившегося сегмента (влияние
+        сдвига быстро затухает с расстоянием). Сравнение идёт с коэффициентами,
+        по которым посчитаны текущие точки сегмента, так что мелкие изменения
+        не накапливаются.
+        """
+        previous = self.spline
+        self.spline = NaturalCubicSpline(self.points[:, 0], self.points[:, 1])
+        counts = self.segment_counts()
+        changed = np.union1d(self.spline.changed_segments(previous, self.sampled),
+                             np.flatnonzero(counts != self.counts))
+
+        if len(changed):
+            first, last = changed[0], changed[-1] + 1
+            self.curve_points = np.concatenate((
+                self.curve_points[:self.starts[first]],
+                self.spline.sample_intervals(counts, np.arange(first, last)),
+                self.curve_points[self.starts[last]:],
+            ))
+            self.sampled[:, first:last] = self.spline.coefficients[:, first:last]
+            self.counts = counts
+            self.starts = np.concatenate(([0], np.cumsum(counts)))
+        self.curve_points[-1] = self.spline.end_points()[0]
+        self.curve.set_data(self.curve_points[:, 0], self.curve_points[:, 1])
 
     def update_curve(self):
-        if self.curve:
-            self.curve.remove()
-
         if len(self.points) >= 2:
-            curve_points = self.calculate_cubic_spline()
-            self.curve, = self.ax.plot(curve_points[:, 0], curve_points[:, 1], 'blue')
-
+            self.curve_points = self.calculate_cubic_spline()
+        else:
+            self.spline = None
+            self.curve_points = np.empty((0, 2))
+        self.curve.set_data(self.curve_points[:, 0], self.curve_points[:, 1])
+
+        self.fig.canvas.draw_idle()
+
+    def start_drag(self, point_id):
+        """
+        Начало перетаскивания: кривая и точки рисуются отдельно от остального,
+        фон запоминается для блиттинга.
+        """
+        self.selected = point_id
+        self.markers.set_animated(True)
+        self.curve.set_animated(True)
         self.fig.canvas.draw()
+        self.background = self.fig.canvas.copy_from_bbox(self.ax.bbox)
+        self.blit()
+
+    def blit(self):
+        """Восстановление фона и отрисовка только кривой и точек."""
+        self.fig.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.curve)
+        self.ax.draw_artist(self.markers)
+        self.fig.canvas.blit(self.ax.bbox)
+
+    def apply_motion(self):
+        """Сдвиг точки в последнее положение мыши (не чаще раза за кадр)."""
+        if self.pending is None or self.selected is None:
+            return
+        x, y = self.pending
+        self.pending = None
+
+        self.points[self.row(self.selected)] = (x, y)
+        self.index.move(self.selected, x, y)
+        self.markers.set_offsets(self.points)
+        if len(self.points) >= 2:
+            self.update_segments()
+        self.blit()
 
     def on_click(self, event):
         if event.inaxes != self.ax:
             return
+        point_id = self.pick(event)
         if event.button == MouseButton.LEFT:
-            for circle in self.circles:
-                contains, _ = circle.contains(event)
-                if contains:
-                    self.selected_circle = circle
-                    return
+            if point_id is not None:
+                self.start_drag(point_id)
+                return
             self.add_point(event.xdata, event.ydata)
         elif event.button == MouseButton.RIGHT:
-            for circle in self.circles:
-                contains, _ = circle.contains(event)
-                if contains:
-                    self.remove_point(circle)
-                    return
+            if point_id is not None:
+                self.remove_point(point_id)
 
     def on_release(self, event):
-        self.selected_circle = None
+        if self.selected is None:
+            return
+        self.frame_timer.stop()
+        self.apply_motion()
+
+        self.markers.set_animated(False)
+        self.curve.set_animated(False)
+        self.selected = None
+        self.background = None
+        self.fig.canvas.draw_idle()
 
     def on_motion(self, event):
-        if not self.selected_circle or event.inaxes != self.ax:
+        """
+        События движения мыши только запоминают положение; сдвиг
+        и перерисовка выполняются по таймеру не чаще раза за кадр.
+        """
+        if self.selected is None or event.inaxes != self.ax:
             return
-        index = self.circles.index(self.selected_circle)
-        self.points[index] = np.array([event.xdata, event.ydata])
-        self.selected_circle.center = (event.xdata, event.ydata)
-        self.update_curve()
+        if self.pending is None:
+            self.frame_timer.start()
+        self.pending = (event.xdata, event.ydata)
 
     def show(self):
         plt.show()
@@ -0,0 +1,143 @@
+import os
+
+from raster import fit_bbox
+
+
+class VectorWriter:
+    """
+    Потоковая запись ломаных в векторный файл.
+
+    Точки подаются частями (как в Rasterizer.draw): каждая часть сразу
+    переводится в команды пути и дописывается в файл, поэтому память
+    не зависит от общего числа отрезков. Масштаб задаётся охватывающим
+    прямоугольником bbox, который нужно знать заранее.
+    """
+
+    def __init__(self, file, width, height, bbox, margin=10):
+        self.file = file
+        self.width = width
+        self.height = height
+        self._last = None
+
+        self.scale, self.offset_x, self.offset_y = fit_bbox(width, height, bbox, margin)
+        self.file.write(self.header())
+
+    def to_page(self, points):
+        """Координаты точек на странице (x, y — списки)."""
+        x = points[:, 0] * self.scale + self.offset_x
+        y = points[:, 1] * self.scale + self.offset_y
+        return x.tolist(), y.tolist()
+
+    def path_data(self, points, breaks=None):
+        """
+        Команды пути для очередной части точек. breaks[i] = True означает,
+        что в точку i черепаха переходит без рисования.
+        """
+        if len(points) == 0:
+            return ""
+        moves = [True] * len(points) if breaks is None else [bool(value) for value in breaks]
+        if self._last is None:
+            # Первая точка пути — всегда начало линии; иначе ломаная
+            # продолжается из последней точки предыдущей части
+            moves[0] = True
+
+        x, y = self.to_page(points)
+        self._last = (x[-1], y[-1])
+        return self.commands(moves, x, y)
+
+    def fragment_data(self, points, breaks=None):
+        """
+        Команды для части, которая не продолжает ранее записанные точки
+        (например, когда части разных путей пишутся вперемешку): первая
+        точка всегда начинает новую линию.
+        """
+        self._last = None
+        return self.path_data(points, breaks)
+
+    def draw(self, points, breaks=None):
+        self.file.write(self.path_data(points, breaks))
+
+    def begin_path(self, color=(0, 100, 0), line_width=1.0):
+        self._last = None
+        self.file.write(self.path_start(color, line_width))
+
+    def end_path(self):
+        self.file.write(self.path_end())
+
+    def close(self):
+        self.file.write(self.footer())
+
+
+class SvgWriter(VectorWriter):
+    """SVG: каждый путь — один элемент <path>, данные пишутся по частям."""
+
+    def header(self):
+        return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.width}" '
+                f'height="{self.height}" viewBox="0 0 {self.width} {self.height}">\n'
+                f'<rect width="100%" height="100%" fill="white"/>\n')
+
+    def to_page(self, points):
+        # Ось y в SVG направлена вниз
+        x = points[:, 0] * self.scale + self.offset_x
+        y = self.height - (points[:, 1] * self.scale + self.offset_y)
+        return x.tolist(), y.tolist()
+
+    def commands(self, moves, x, y):
+        return "".join(map("%s%.2f %.2f".__mod__, zip(["M" if move else "L" for move in moves], x, y)))
+
+    def path_start(self, color, line_width):
+        red, green, blue = color
+        return (f'<path fill="none" stroke="rgb({red},{green},{blue})" stroke-width="{line_width:g}" '
+                f'stroke-linecap="round" stroke-linejoin="round" d="')
+
+    def path_end(self):
+        return '"/>\n'
+
+    def footer(self):
+        return "</svg>\n"
+
+
+class EpsWriter(VectorWriter):
+    """
+    Encapsulated PostScript. Каждая часть точек обводится отдельно
+    (stroke), чтобы путь не превышал ограничений интерпретаторов.
+    """
+
+    def header(self):
+        return ("%!PS-Adobe-3.0 EPSF-3.0\n"
+                f"%%BoundingBox: 0 0 {self.width} {self.height}\n"
+                "/m {moveto} bind def /l {lineto} bind def\n"
+                "1 setlinecap 1 setlinejoin\n"
+                f"1 setgray 0 0 {self.width} {self.height} rectfill\n")
+
+    def path_data(self, points, breaks=None):
+        last = self._last
+        data = super().path_data(points, breaks)
+        if not data:
+            return data
+        # Новая часть начинается с новой линии из последней точки предыдущей
+        start = "" if last is None else "%.2f %.2f m\n" % last
+        return "newpath\n" + start + data + "stroke\n"
+
+    def commands(self, moves, x, y):
+        return "".join(map("%.2f %.2f %s\n".__mod__, zip(x, y, ["m" if move else "l" for move in moves])))
+
+    def path_start(self, color, line_width):
+        red, green, blue = (channel / 255 for channel in color)
+        return f"{red:.3f} {green:.3f} {blue:.3f} setrgbcolor {line_width:g} setlinewidth\n"
+
+    def path_end(self):
+        return ""
+
+    def footer(self):
+        return "showpage\n%%EOF\n"
+
+
+def vector_writer(output, file, width, height, bbox, margin=10, format=None):
+    """Писатель для формата format ("svg" или "eps"; по умолчанию — по расширению output)."""
+    if format is None:
+        format = os.path.splitext(output)[1].lstrip(".").lower() or "svg"
+    writers = {"svg": SvgWriter, "eps": EpsWriter, "ps": EpsWriter}
+    if format not in writers:
+        raise ValueError(f"Неизвестный формат векторного файла: {format}")
+    return writers[format](file, width, height, bbox, margin)